@@ -0,0 +1,86 @@
+# Approximate city-centre coordinates (latitude, longitude) for the cities in
+# cities.israeli_cities, keyed by city name.
+city_coordinates = {
+    "ירושלים": (31.7683, 35.2137),
+    "תל אביב-יפו": (32.0853, 34.7818),
+    "חיפה": (32.7940, 34.9896),
+    "ראשון לציון": (31.9730, 34.7925),
+    "פתח תקווה": (32.0840, 34.8878),
+    "נתניה": (32.3215, 34.8532),
+    "אשדוד": (31.8014, 34.6435),
+    "בני ברק": (32.0807, 34.8338),
+    "באר שבע": (31.2520, 34.7915),
+    "חולון": (32.0158, 34.7874),
+    "רמת גן": (32.0684, 34.8248),
+    "בית שמש": (31.7470, 34.9881),
+    "אשקלון": (31.6688, 34.5743),
+    "רחובות": (31.8928, 34.8113),
+    "בת ים": (32.0171, 34.7454),
+    "הרצליה": (32.1624, 34.8447),
+    "חדרה": (32.4340, 34.9196),
+    "מודיעין-מכבים-רעות": (31.8980, 35.0104),
+    "כפר סבא": (32.1782, 34.9076),
+    "לוד": (31.9510, 34.8881),
+    "מודיעין עילית": (31.9322, 35.0442),
+    "רהט": (31.3925, 34.7544),
+    "רמלה": (31.9293, 34.8656),
+    "רעננה": (32.1848, 34.8713),
+    "נצרת": (32.6996, 35.3035),
+    "ראש העין": (32.0956, 34.9566),
+    "ביתר עילית": (31.6997, 35.1150),
+    "קריית גת": (31.6100, 34.7642),
+    "נהריה": (33.0059, 35.0941),
+    "הוד השרון": (32.1500, 34.8880),
+    "עפולה": (32.6091, 35.2892),
+    "גבעתיים": (32.0722, 34.8125),
+    "קריית אתא": (32.8090, 35.1060),
+    "אום אל-פחם": (32.5194, 35.1536),
+    "יבנה": (31.8780, 34.7390),
+    "אילת": (29.5577, 34.9519),
+    "עכו": (32.9281, 35.0820),
+    "נתיבות": (31.4231, 34.5886),
+    "אלעד": (32.0520, 34.9510),
+    "טבריה": (32.7959, 35.5310),
+    "נס ציונה": (31.9293, 34.7987),
+    "קריית מוצקין": (32.8370, 35.0770),
+    "רמת השרון": (32.1461, 34.8394),
+    "כרמיאל": (32.9190, 35.2901),
+    "טייבה": (32.2660, 35.0100),
+    "קריית ביאליק": (32.8275, 35.0860),
+    "נוף הגליל": (32.7080, 35.3260),
+    "קריית אונו": (32.0636, 34.8553),
+    "שפרעם": (32.8050, 35.1700),
+    "קריית ים": (32.8490, 35.0690),
+    "אור יהודה": (32.0290, 34.8560),
+    "צפת": (32.9646, 35.4960),
+    "מעלה אדומים": (31.7770, 35.2980),
+    "דימונה": (31.0700, 35.0330),
+    "חריש": (32.4630, 35.0430),
+    "אופקים": (31.3140, 34.6200),
+    "טמרה": (32.8530, 35.1980),
+    "שדרות": (31.5250, 34.5960),
+    "סח'נין": (32.8640, 35.2970),
+    "באר יעקב": (31.9420, 34.8370),
+    "באקה אל-גרבייה": (32.4200, 35.0420),
+    "יהוד-מונוסון": (32.0330, 34.8900),
+    "טירת כרמל": (32.7600, 34.9710),
+    "כפר יונה": (32.3170, 34.9350),
+    "גבעת שמואל": (32.0780, 34.8480),
+    "ערד": (31.2580, 35.2130),
+    "טירה": (32.2340, 34.9500),
+    "מגדל העמק": (32.6770, 35.2400),
+    "עראבה": (32.8510, 35.3350),
+    "קריית מלאכי": (31.7300, 34.7460),
+    "כפר קאסם": (32.1140, 34.9760),
+    "יקנעם עילית": (32.6590, 35.1100),
+    "קלנסווה": (32.2850, 34.9810),
+    "גני תקווה": (32.0600, 34.8730),
+    "מע'אר": (32.8890, 35.4070),
+    "נשר": (32.7660, 35.0440),
+    "קריית שמונה": (33.2070, 35.5700),
+    "מעלות-תרשיחא": (33.0160, 35.2710),
+    "אור עקיבא": (32.5080, 34.9200),
+    "אריאל": (32.1060, 35.1870),
+    "כפר קרע": (32.5050, 35.0570),
+    "בית שאן": (32.4970, 35.4970),
+}
@@ -1,15 +1,77 @@
 # app.py
 import streamlit as st
 import requests
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 import pandas as pd
 from services.whatsapp import send_message
-from cities import israeli_cities
+from services.city_registry import city_registry
 
 API_URL = "http://localhost:8000"
 
-# Extract city names from the israeli_cities data
-city_names = [city['שם העיר'] for city in israeli_cities]
+# City names from the prebuilt city registry
+city_names = list(city_registry.names)
+
+# Seconds to follow a background broadcast before leaving it running
+BROADCAST_POLL_TIMEOUT = 300
+
+# Rows per page of the dashboard tables
+PAGE_SIZE = 100
+# Rows requested for dropdown options (the API maximum)
+OPTIONS_LIMIT = 1000
+
+
+def fetch_page(path, params=None, after=None, limit=PAGE_SIZE):
+    """Fetch one page of a list endpoint; returns its rows and the next page's cursor."""
+    params = {**(params or {}), "limit": limit}
+    if after is not None:
+        params["after"] = after
+    response = requests.get(f"{API_URL}{path}", params=params)
+    response.raise_for_status()
+    return response.json(), response.headers.get("X-Next-Cursor")
+
+
+def fetch_options(path):
+    """Fetch the rows of a list endpoint used as dropdown options (first OPTIONS_LIMIT)."""
+    rows, next_cursor = fetch_page(path, limit=OPTIONS_LIMIT)
+    if next_cursor:
+        st.warning(f"Only the first {OPTIONS_LIMIT} entries are listed.")
+    return rows
+
+
+def load_page(key, path, params=None, reset=False):
+    """
+    Load the current page of a list endpoint into st.session_state[key].
+
+    The cursors of the pages visited so far and the filters are kept in the
+    session state, so each rerun requests a single page.
+    """
+    if reset or f"{key}_cursors" not in st.session_state:
+        st.session_state[f"{key}_cursors"] = [None]
+        st.session_state[f"{key}_params"] = params or {}
+    rows, next_cursor = fetch_page(path, st.session_state[f"{key}_params"], st.session_state[f"{key}_cursors"][-1])
+    st.session_state[key] = rows
+    st.session_state[f"{key}_next"] = next_cursor
+
+
+def page_buttons(key, path):
+    """Previous/next page buttons for a list loaded with load_page."""
+    cursors = st.session_state[f"{key}_cursors"]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if len(cursors) > 1 and st.button("◀", key=f"{key}_previous_page"):
+            cursors.pop()
+            load_page(key, path)
+            st.rerun()
+    with col2:
+        st.caption(f"Page {len(cursors)}")
+    with col3:
+        if st.session_state[f"{key}_next"] and st.button("▶", key=f"{key}_next_page"):
+            cursors.append(st.session_state[f"{key}_next"])
+            load_page(key, path)
+            st.rerun()
 
 def main():
     st.title("מערכת ניהול - אנשי מקצוע")
@@ -99,9 +161,7 @@ def professional_page():
     st.header("ניהול בעלי מלאכה")
 
     # קבלת רשימת מקצועות קיימת מה-API
-    professions_response = requests.get(f"{API_URL}/professions/")
-    professions_response.raise_for_status()
-    professions = [p['name'] for p in professions_response.json()]
+    professions = [p['name'] for p in fetch_options("/professions/")]
 
     # הוספת מקצוע חדש
     with st.expander("הוספת מקצוע חדש"):
@@ -177,21 +237,20 @@ def professional_page():
             params["available"] = availability_filter == "זמין"
 
         try:
-            st.session_state.professionals = requests.get(
-                f"{API_URL}/professionals/",
-                params=params
-            ).json()
+            load_page("professionals", "/professionals/", params, reset=True)
         except requests.exceptions.RequestException as e:
             st.error(f"שגיאת תקשורת עם ה-API: {e}")
             return
 
     if 'professionals' not in st.session_state:
         try:
-            st.session_state.professionals = requests.get(f"{API_URL}/professionals/").json()
+            load_page("professionals", "/professionals/")
         except requests.exceptions.RequestException as e:
             st.error(f"שגיאת תקשורת עם ה-API: {e}")
             return
 
+    page_buttons("professionals", "/professionals/")
+
     if st.session_state.professionals:
         df = pd.DataFrame(st.session_state.professionals)
 
@@ -232,7 +291,7 @@ def professional_page():
                         )
                         if response.status_code == 200:
                             st.success("עודכן בהצלחה!")
-                            st.session_state.professionals = requests.get(f"{API_URL}/professionals/").json()
+                            load_page("professionals", "/professionals/")
                             st.rerun()
                         else:
                             st.error("שגיאה בעדכון בעל מלאכה")
@@ -242,7 +301,7 @@ def professional_page():
                             response = requests.delete(f"{API_URL}/professionals/{row['id']}")
                             if response.status_code == 200:
                                 st.success("נמחק בהצלחה!")
-                                st.session_state.professionals = requests.get(f"{API_URL}/professionals/").json()
+                                load_page("professionals", "/professionals/")
                                 st.rerun()
                             else:
                                 st.error("שגיאה במחיקת בעל מלאכה")
@@ -258,6 +317,7 @@ def professional_page():
 
 def csv_upload_page():
     API_URL = "http://localhost:8000/professionals/upload-csv/"
+    IMPORTS_URL = "http://localhost:8000/imports"
     st.header("העלאת CSV וייבוא בעלי מלאכה")
 
     uploaded_file = st.file_uploader("בחר קובץ CSV", type="csv")
@@ -267,9 +327,28 @@ def csv_upload_page():
         
         if st.button("ייבא נתונים"):
             files = {'file': uploaded_file}
-            response = requests.post(API_URL, files=files)
+            job_id = uuid.uuid4().hex
+
+            # Upload in the background and poll the import job for live progress
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(requests.post, API_URL, files=files, params={"job_id": job_id})
+                progress = st.progress(0.0)
+                status = st.empty()
+                while not future.done():
+                    time.sleep(0.5)
+                    job_response = requests.get(f"{IMPORTS_URL}/{job_id}")
+                    if job_response.status_code != 200:
+                        continue
+                    job = job_response.json()
+                    if job['bytes_total']:
+                        progress.progress(min(job['bytes_read'] / job['bytes_total'], 1.0))
+                    status.write(
+                        f"שורות שנקראו: {job['rows_read']} | נוספו: {job['professionals_added']} | דולגו: {job['skipped']}"
+                    )
+                response = future.result()
 
             if response.status_code == 200:
+                progress.progress(1.0)
                 st.success("בעלי המלאכה יובאו בהצלחה.")
                 st.write(response.json()) # הצגת תגובת ה-API
             else:
@@ -293,6 +372,11 @@ def display_messages_page(messages):
         return
 
     for msg in messages:
+        intent = msg['intent']
+        if intent:
+            intent_text = f"{intent['intent']}: {intent['summary']}" if intent.get('summary') else intent['intent']
+        else:
+            intent_text = 'לא זוהה כוונה'
         with st.container():
             st.markdown(
                 f"""
@@ -304,7 +388,7 @@ def display_messages_page(messages):
                     background-color: #f9f9f9;">
                     <b>{msg['fromName']}</b> <span style="color: gray;">({msg['timestamp']})</span>
                     <p>{msg['body']}</p>
-                    <p><b>Intent:</b> <span style="color:blue;">{msg['intent'] or 'לא זוהה כוונה'}</span></p>
+                    <p><b>Intent:</b> <span style="color:blue;">{intent_text}</span></p>
                 </div>
                 """,
                 unsafe_allow_html=True
@@ -318,9 +402,7 @@ def dispaly_messages():
 def service_call_page():
     st.header("Service Calls Management")
     
-    professions_response = requests.get(f"{API_URL}/professions/")
-    professions_response.raise_for_status()
-    professions = [p['name'] for p in professions_response.json()]
+    professions = [p['name'] for p in fetch_options("/professions/")]
     
     # Create new service call
     with st.expander("Create New Service Call"):
@@ -370,14 +452,14 @@ def service_call_page():
     
     if st.button("Refresh Service Calls"):
         if status_filter == "All":
-            st.session_state.service_calls = requests.get(f"{API_URL}/service-calls/").json()
+            load_page("service_calls", "/service-calls/", reset=True)
         else:
-            st.session_state.service_calls = requests.get(
-                f"{API_URL}/service-calls/by-status/{status_filter}"
-            ).json()
+            load_page("service_calls", "/service-calls/", {"status": status_filter}, reset=True)
     
     if 'service_calls' not in st.session_state:
-        st.session_state.service_calls = requests.get(f"{API_URL}/service-calls/").json()
+        load_page("service_calls", "/service-calls/")
+
+    page_buttons("service_calls", "/service-calls/")
     
     if st.session_state.service_calls:
         df = pd.DataFrame(st.session_state.service_calls)
@@ -408,11 +490,8 @@ def service_call_page():
                     st.write("Professionals for this service call:")
                     
                     print(row['locations'])
-                    # Get professionals matching this service call's criteria
-                    matching_professionals = get_professionals_by_profession_and_cities(
-                        row['profession'], 
-                        row['locations']
-                    )
+                    # Get the best-ranked professionals for this service call
+                    matching_professionals = get_matching_professionals(row['id'])
 
                     # Check if we have any matching professionals
                     if not matching_professionals or len(matching_professionals) == 0:
@@ -424,7 +503,7 @@ def service_call_page():
                         # Remove unwanted columns and capitalize column names
                         if not prof_df.empty:
                             # Select only the columns we want to display
-                            prof_df = prof_df[['name', 'phone', 'location']]
+                            prof_df = prof_df[['name', 'phone', 'location', 'distance_km', 'score']]
                             
                             # Capitalize column names
                             prof_df.columns = [col.capitalize() for col in prof_df.columns]
@@ -444,7 +523,7 @@ def service_call_page():
                         )
                         if response.status_code == 200:
                             st.success("Updated successfully!")
-                            st.session_state.service_calls = requests.get(f"{API_URL}/service-calls/").json()
+                            load_page("service_calls", "/service-calls/")
                             st.rerun()
                         else:
                             st.error("Error updating service call")
@@ -454,31 +533,22 @@ def service_call_page():
                             response = requests.delete(f"{API_URL}/service-calls/{row['id']}")
                             if response.status_code == 200:
                                 st.success("Deleted successfully!")
-                                st.session_state.service_calls = requests.get(f"{API_URL}/service-calls/").json()
+                                load_page("service_calls", "/service-calls/")
                                 st.rerun()
                             else:
                                 st.error("Error deleting service call")
                     
                     if notify_button:
-                        sent_count = send_notifications(row['profession'], row['description'], row['locations'])
+                        sent_count = send_notifications(row['id'], row['description'])
                         if sent_count > 0:
                             st.success(f"Notifications sent to {sent_count} professionals")
                         else:
                             st.warning("No notifications sent. No available professionals found.")
 
 
-def get_professionals_by_profession_and_cities(profession, cities):
+def get_matching_professionals(service_call_id):
     try:
-        if cities is None:
-            response = requests.get(
-                f"{API_URL}/professionals/by-profession/{profession}"
-            )
-        else:
-            response = requests.post(
-                f"{API_URL}/professionals/by-profession-and-cities/",
-                json={"profession": profession, "cities": cities}
-            )
-        
+        response = requests.get(f"{API_URL}/service-calls/{service_call_id}/matches")
         response.raise_for_status()
         return response.json()
     except requests.RequestException as e:
@@ -486,17 +556,38 @@ def get_professionals_by_profession_and_cities(profession, cities):
         return []
 
 
-def send_notifications(profession, description, cities=None):
-    professionals = get_professionals_by_profession_and_cities(profession, cities)
-    
-    notification_msg = f"""{description}"""
-    
-    sent_count = 0
-    for prof in professionals:
-        if send_message(prof['phone'], notification_msg):
-            sent_count += 1
-    
-    return sent_count
+def send_notifications(service_call_id, description):
+    # The API fans the message out in the background; poll the job for progress
+    try:
+        response = requests.post(
+            f"{API_URL}/service-calls/{service_call_id}/notify",
+            params={"background": True},
+            json={"message": description}
+        )
+        response.raise_for_status()
+        job = response.json()
+
+        progress = st.progress(0.0)
+        deadline = time.monotonic() + BROADCAST_POLL_TIMEOUT
+        while job['status'] != "COMPLETED":
+            if time.monotonic() > deadline:
+                st.warning("Notifications are still being sent in the background.")
+                return job['sent']
+            time.sleep(0.5)
+            poll = requests.get(f"{API_URL}/broadcasts/{job['job_id']}")
+            if poll.status_code == 404:
+                # Evicted from the API's job history, or the API restarted
+                st.warning("Lost track of the notification job; check the service call later.")
+                return job['sent']
+            poll.raise_for_status()
+            job = poll.json()
+            if job['total']:
+                progress.progress((job['total'] - job['pending']) / job['total'])
+    except requests.RequestException as e:
+        st.error(f"Error sending notifications: {str(e)}")
+        return 0
+
+    return job['sent']
 
 
 if __name__ == "__main__":
@@ -1,10 +1,8 @@
-from io import StringIO
-from fastapi import FastAPI, File, Request, HTTPException, UploadFile
+from fastapi import FastAPI, File, Query, Request, Response, HTTPException, UploadFile
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from langchain_openai import OpenAI
 import uvicorn
-import csv
 from prisma import Prisma
 from dotenv import load_dotenv
 import logging
@@ -13,13 +11,28 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from prisma import Prisma
+from prisma.errors import UniqueViolationError
 from pydantic import BaseModel
 from datetime import datetime
 from typing import List, Optional, AsyncGenerator
 import logging
+import math
 import os
 from dotenv import load_dotenv
-from services.whatsapp import send_message
+from services.whatsapp import send_message_async, close_async_client
+from services.dedup import message_ids
+from services.intent import intent_analyzer
+from services.intent_cache import intent_cache
+from services.intent_schema import Intent, IntentResult
+from services.queue import MessageQueue
+from services.broadcast import Broadcaster
+from services.phone_cache import MISSING, normalize_phone, phone_cache, phone_variants
+from services.professions import profession_registry
+from services.city_names import ALIASES, city_names
+from services.proximity import SEARCH_RINGS_KM, city_proximity, rank_by_distance
+from services.matching import MATCH_RADIUS_KM, matching_engine
+from services.assignments import claim_open_service_call
+from services.csv_import import create_import_job, get_import_job, iter_csv_rows
 # Load environment variables
 load_dotenv()
 
@@ -30,6 +43,13 @@ logger = logging.getLogger(__name__)
 # Initialize Prisma client
 prisma = Prisma()
 
+# Acknowledge webhook deliveries first and analyze messages in background workers
+WEBHOOK_ACK_FIRST = os.getenv("WEBHOOK_ACK_FIRST", "false").lower() == "true"
+MESSAGE_QUEUE_WORKERS = int(os.getenv("MESSAGE_QUEUE_WORKERS", "4"))
+
+# Concurrent, rate-limited fan-out of WhatsApp notifications (workflow replies share the rate limit)
+broadcaster = Broadcaster(send_message_async)
+
 # Pydantic models
 from typing import Optional
 
@@ -45,6 +65,7 @@ class ProfessionalUpdate(BaseModel):
     phone: Optional[str] = None
     profession: Optional[str] = None
     available: Optional[bool] = None
+    location: Optional[str] = None
 
 class ServiceCallCreate(BaseModel):
     title: str
@@ -67,13 +88,28 @@ class ServiceCallUpdate(BaseModel):
 class ProfessionCreate(BaseModel):
     name: str
 
+class NearbyRequest(BaseModel):
+    profession: str
+    cities: List[str]
+    radius_km: float = SEARCH_RINGS_KM[-1]  # Widest search radius
+    min_results: int = 10  # Stop widening once this many are found
+
+class NotifyRequest(BaseModel):
+    message: Optional[str] = None  # Overrides the default notification text
+
 
 async def lifespan(app: FastAPI) -> AsyncGenerator:
     """Lifespan context manager to handle startup and shutdown events."""
     await prisma.connect()
     logger.info("Prisma client connected.")
     app.state.prisma = prisma
+    await profession_registry.load(prisma)
+    # Off the event loop: tiktoken downloads its encoding with a blocking request
+    await intent_analyzer.tokens.load_async()
+    await message_queue.start()
     yield
+    await message_queue.stop()
+    await close_async_client()
     await prisma.disconnect()
     logger.info("Prisma client disconnected.")
 
@@ -99,6 +135,25 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         },
     )
 
+# Pagination helpers
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def page_args(where: dict, limit: int, after: Optional[int]) -> dict:
+    """Build keyset pagination arguments: rows with id > after, ordered by id."""
+    if after is not None:
+        where = {**where, "id": {"gt": after}}
+    return {"where": where, "order": {"id": "asc"}, "take": limit}
+
+def set_next_cursor(response: Response, rows: list, limit: int) -> None:
+    """Expose the cursor of the next page in the X-Next-Cursor header."""
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+
+def city_variants(cities: List[str]) -> List[str]:
+    """Cities as given plus their canonical names, to also match rows stored before canonicalization."""
+    return list(dict.fromkeys([*cities, *city_names.canonicalize_many(cities)]))
+
 # Serialization helpers
 def serialize_datetime(dt: datetime) -> str:
     return dt.isoformat() if dt else None
@@ -109,7 +164,7 @@ def serialize_professional(professional) -> dict:
         "name": professional.name,
         "phone": professional.phone,
         "location": professional.location,
-        "profession": professional.profession,
+        "profession": profession_registry.name_for(professional.professionId),
         "available": professional.available,
         "createdAt": serialize_datetime(professional.createdAt)
     }
@@ -135,6 +190,7 @@ async def create_profession(profession: ProfessionCreate):
                 "name": profession.name,
             }
         )
+        profession_registry.add(created)
         logger.info(f"Created profession: {created.id}")
         return {
             "id": created.id,
@@ -151,9 +207,14 @@ def serialize_profession(profession) -> dict:
     }
 
 @app.get("/professions/", response_model=List[dict])
-async def get_professions():
+async def get_professions(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None
+):
     try:
-        professions = await prisma.profession.find_many()
+        professions = await prisma.profession.find_many(**page_args({}, limit, after))
+        set_next_cursor(response, professions, limit)
         return [serialize_profession(p) for p in professions]
     except Exception as e:
         logger.error(f"Error fetching professions: {e}")
@@ -174,35 +235,54 @@ async def get_profession(profession_id: int):
 async def create_professional(professional: ProfessionalCreate):
     try:
         # 1. Look up the profession by name
-        profession_record = await prisma.profession.find_unique(
-            where={"name": professional.profession}
-        )
-
-        if not profession_record:
-            raise HTTPException(status_code=400, detail="Profession not found")
+        profession_id = await get_profession_id(professional.profession)
 
         # 2. Create the professional and link to the profession using professionId
         created = await prisma.professional.create(
             data={
                 "name": professional.name,
                 "phone": professional.phone,
-                "professionId": profession_record.id,  # ✅ Prisma connects this to the relation
+                "professionId": profession_id,  # ✅ Prisma connects this to the relation
                 "available": professional.available,
-                "location": professional.location
+                "location": city_names.canonicalize(professional.location)
             }
         )
 
+        # Drop a cached "unknown sender" entry for this phone
+        phone_cache.invalidate([created.phone])
+        matching_engine.invalidate()
+
         return serialize_professional(created)
 
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error creating professional: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/professionals/", response_model=List[dict])
-async def get_professionals():
+async def get_professionals(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    profession: Optional[str] = None,
+    available: Optional[bool] = None,
+    city: Optional[str] = None
+):
     try:
-        professionals = await prisma.professional.find_many()
+        where_clause = {}
+        if profession is not None:
+            where_clause["professionId"] = await get_profession_id(profession)
+        if available is not None:
+            where_clause["available"] = available
+        if city is not None:
+            where_clause["location"] = {"in": city_variants([city])}
+
+        professionals = await prisma.professional.find_many(**page_args(where_clause, limit, after))
+        set_next_cursor(response, professionals, limit)
         return [serialize_professional(p) for p in professionals]
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error fetching professionals: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -233,14 +313,21 @@ async def update_professional(professional_id: int, data: ProfessionalUpdate):
             # Replace profession name with profession ID
             update_data['professionId'] = profession_id
             del update_data['profession']
+
+        if update_data.get('location') is not None:
+            update_data['location'] = city_names.canonicalize(update_data['location'])
             
-        print(update_data)
         updated = await prisma.professional.update(
             where={"id": professional_id},
             data=update_data
         )
+        phone_cache.invalidate_professional(professional_id)
+        phone_cache.invalidate([updated.phone])
+        matching_engine.invalidate()
         logger.info(f"Updated professional: {professional_id}")
         return serialize_professional(updated)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error updating professional: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -250,23 +337,59 @@ async def get_professionals_by_profession(profession: str):
     try:
         professionals = await prisma.professional.find_many(
             where={
-                "profession": profession,
+                "professionId": await get_profession_id(profession),
                 "available": True
             }
         )
         return [serialize_professional(p) for p in professionals]
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error fetching professionals by profession: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def find_professional_by_phone(phone: str):
+    """Look up the professional for a phone number, going through the phone cache."""
+    professional = phone_cache.lookup(phone)
+    if professional is MISSING:
+        professional = await prisma.professional.find_first(
+            where={"phone": {"in": phone_variants(phone)}},
+            order={"id": "asc"}
+        )
+        phone_cache.store(phone, professional)
+    return professional
+
+async def find_professionals_by_phones(phones) -> dict:
+    """Resolve many phones at once: cached ones from memory, the rest with one query."""
+    found = {}
+    missing = []
+    for phone in set(phones):
+        professional = phone_cache.lookup(phone)
+        if professional is MISSING:
+            missing.append(phone)
+        else:
+            found[phone] = professional
+
+    if missing:
+        professionals = await prisma.professional.find_many(
+            where={"phone": {"in": [v for phone in missing for v in phone_variants(phone)]}},
+            order={"id": "asc"}
+        )
+        by_number = {}
+        for professional in professionals:
+            by_number.setdefault(normalize_phone(professional.phone), professional)
+        for phone in missing:
+            found[phone] = by_number.get(normalize_phone(phone))
+            phone_cache.store(phone, found[phone])
+
+    return found
+
 async def get_profession_id(profession_name: str) -> Optional[int]:
     """Translate a profession name to its corresponding ID."""
-    profession_record = await prisma.profession.find_unique(
-        where={"name": profession_name}
-    )
-    if not profession_record:
+    profession_id = await profession_registry.resolve_id(prisma, profession_name)
+    if profession_id is None:
         raise HTTPException(status_code=400, detail="Profession not found")
-    return profession_record.id
+    return profession_id
 
 @app.post("/professionals/by-profession-and-cities/")
 async def get_professionals_by_profession_and_cities(data: dict):
@@ -285,7 +408,7 @@ async def get_professionals_by_profession_and_cities(data: dict):
         
         # Only add location filter if cities are provided
         if cities and len(cities) > 0:
-            where_clause["location"] = {"in": cities}
+            where_clause["location"] = {"in": city_variants(cities)}
             
         professionals = await prisma.professional.find_many(
             where=where_clause
@@ -295,6 +418,40 @@ async def get_professionals_by_profession_and_cities(data: dict):
         logger.error(f"Error fetching professionals by profession and cities: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/professionals/nearby/")
+async def get_nearby_professionals(data: NearbyRequest):
+    try:
+        # Every city within the widest radius, with its distance to the nearest call city
+        distances = city_proximity.distances_from(data.cities, data.radius_km)
+
+        where_clause = {
+            "professionId": await get_profession_id(data.profession),
+            "available": True
+        }
+        # Without cities every available professional matches, as in by-profession-and-cities
+        if data.cities:
+            # Raw names and known aliases too, to also match rows stored before canonicalization
+            aliases = [alias for alias, name in ALIASES.items() if name in distances]
+            where_clause["location"] = {"in": list(dict.fromkeys([*city_variants(data.cities), *distances, *aliases]))}
+
+        professionals = await prisma.professional.find_many(where=where_clause)
+
+        default_distance = math.inf if data.cities else 0.0
+        candidates = [
+            {
+                **serialize_professional(p),
+                "distance_km": distances.get(city_names.canonicalize(p.location, fuzzy=True), default_distance)
+            }
+            for p in professionals
+        ]
+        rings = [r for r in SEARCH_RINGS_KM if r < data.radius_km] + [data.radius_km]
+        return rank_by_distance(candidates, data.min_results, rings)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error fetching nearby professionals: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/service-calls/", response_model=dict)
 async def create_service_call(service_call: ServiceCallCreate):
     try:
@@ -303,7 +460,7 @@ async def create_service_call(service_call: ServiceCallCreate):
                 "title": service_call.title,
                 "description": service_call.description,
                 "date": service_call.date,
-                "locations": service_call.locations,
+                "locations": city_names.canonicalize_many(service_call.locations),
                 "profession": service_call.profession,
                 "urgency": service_call.urgency,
                 "status": service_call.status
@@ -315,10 +472,54 @@ async def create_service_call(service_call: ServiceCallCreate):
         logger.error(f"Error creating service call: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def service_call_filters(status: Optional[str], profession: Optional[str], city: Optional[str]) -> dict:
+    where_clause = {}
+    if status is not None:
+        where_clause["status"] = status
+    if profession is not None:
+        where_clause["profession"] = profession
+    if city is not None:
+        where_clause["locations"] = {"hasSome": city_variants([city])}
+    return where_clause
+
 @app.get("/service-calls/", response_model=List[dict])
-async def get_service_calls():
+async def get_service_calls(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    status: Optional[str] = None,
+    profession: Optional[str] = None,
+    city: Optional[str] = None
+):
     try:
-        service_calls = await prisma.servicecall.find_many()
+        service_calls = await prisma.servicecall.find_many(
+            **page_args(service_call_filters(status, profession, city), limit, after)
+        )
+        set_next_cursor(response, service_calls, limit)
+        return [serialize_service_call(sc) for sc in service_calls]
+    except Exception as e:
+        logger.error(f"Error fetching service calls: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Declared before /service-calls/{service_call_id} so "all" is not parsed as an id
+@app.get("/service-calls/all")
+async def get_all_service_calls(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    status: Optional[str] = None,
+    profession: Optional[str] = None,
+    city: Optional[str] = None
+):
+    try:
+        # Get a page of service calls from database
+        service_calls = await prisma.servicecall.find_many(
+            **page_args(service_call_filters(status, profession, city), limit, after),
+            include={
+                "assignments": True
+            }
+        )
+        set_next_cursor(response, service_calls, limit)
         return [serialize_service_call(sc) for sc in service_calls]
     except Exception as e:
         logger.error(f"Error fetching service calls: {e}")
@@ -350,6 +551,8 @@ async def get_service_call(service_call_id: int):
 async def update_service_call(service_call_id: int, data: ServiceCallUpdate):
     try:
         update_data = data.dict(exclude_unset=True)
+        if update_data.get('locations') is not None:
+            update_data['locations'] = city_names.canonicalize_many(update_data['locations'])
         updated = await prisma.servicecall.update(
             where={"id": service_call_id},
             data=update_data
@@ -360,103 +563,197 @@ async def update_service_call(service_call_id: int, data: ServiceCallUpdate):
         logger.error(f"Error updating service call: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     
-@app.get("/service-calls/all")
-async def get_all_service_calls():
-    try:
-        # Get all service calls from database
-        service_calls = await prisma.servicecall.find_many(
-            include={
-                "assignments": True
-            }
-        )
-        return [serialize_service_call(sc) for sc in service_calls]
-    except Exception as e:
-        logger.error(f"Error fetching service calls: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
 @app.post("/service-calls/{service_call_id}/notify")
-async def notify_professionals(service_call_id: int):
+async def notify_professionals(
+    service_call_id: int,
+    background: bool = False,
+    top_k: Optional[int] = Query(None, ge=1),
+    radius_km: float = Query(MATCH_RADIUS_KM, ge=0),
+    data: Optional[NotifyRequest] = None
+):
     try:
         # Get the specific service call
         service_call = await prisma.servicecall.find_unique(
-            where={"id": service_call_id},
-            include={
-                "assignments": True
-            }
+            where={"id": service_call_id}
         )
         
         if not service_call:
             raise HTTPException(status_code=404, detail="Service call not found")
 
-        # Get professionals of matching profession
-        professionals = await prisma.professional.find_many(
-            where={
-                "profession": service_call.profession
-            }
+        # Best available professionals of matching profession around the call's cities
+        candidates = await matching_engine.match(
+            prisma,
+            await get_profession_id(service_call.profession),
+            service_call.locations,
+            top_k=top_k,
+            radius_km=radius_km
         )
         
         # Send notifications
-        notification_message = f"""
+        notification_message = data.message if data and data.message else f"""
         Service Call:
         Title: {service_call.title}
-        Location: {service_call.location}
+        Location: {", ".join(service_call.locations or [])}
         Date: {service_call.date}
         Urgency: {service_call.urgency}
         
         Reply ACCEPT to take this job.
         """
-        
-        notifications_sent = []
-        for professional in professionals:
-            await send_message(professional.phone, notification_message)
-            notifications_sent.append(professional.phone)
 
+        job = broadcaster.create_job(
+            [{"professional_id": c["id"], "phone": c["phone"]} for c in candidates],
+            notification_message
+        )
+
+        if background:
+            # Let the dashboard poll GET /broadcasts/{job_id} for progress
+            broadcaster.start(job)
+            return job.to_dict()
+
+        await broadcaster.run(job)
         return {
             "success": True,
-            "notifications_sent": len(notifications_sent),
-            "professionals_notified": notifications_sent
+            "notifications_sent": job.sent,
+            "professionals_notified": [r["phone"] for r in job.results if r["delivered"]],
+            **job.to_dict()
         }
 
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error sending notifications: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-from openai import OpenAI
+@app.get("/service-calls/{service_call_id}/matches")
+async def get_service_call_matches(
+    service_call_id: int,
+    top_k: Optional[int] = Query(20, ge=1),
+    radius_km: float = Query(MATCH_RADIUS_KM, ge=0)
+):
+    try:
+        service_call = await prisma.servicecall.find_unique(
+            where={"id": service_call_id}
+        )
+        if not service_call:
+            raise HTTPException(status_code=404, detail="Service call not found")
 
-private = os.environ.get("OPENAI_API_KEY")
-client = OpenAI(
-    # defaults to os.environ.get("OPENAI_API_KEY")
-    api_key=private,
-)
+        return await matching_engine.match(
+            prisma,
+            await get_profession_id(service_call.profession),
+            service_call.locations,
+            top_k=top_k,
+            radius_km=radius_km
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error matching professionals: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-def analyze_message_with_chatgpt(prompt):
-    try:
-        full_prompt = f"""
-        אתה עוזר וירטואלי המיועד להבין את הכוונה שמסתתרת מאחורי ההודעה. 
-        ההודעה שהתקבלה היא: {prompt}
+@app.get("/broadcasts/{job_id}")
+async def get_broadcast(job_id: str):
+    job = broadcaster.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return job.to_dict()
+
+async def process_message(from_number: str, from_name: str, message_text: str, intent_analysis: Optional[IntentResult]) -> dict:
+    """Run the ACCEPT/COMPLETE workflow for a single stored message."""
+    result = {
+        "from": from_number,
+        "name": from_name,
+        "message": message_text,
+        "intent": intent_analysis.model_dump(exclude_none=True) if intent_analysis else None,
+    }
+
+    # Find professional by phone number
+    professional = await find_professional_by_phone(from_number)
+
+    if not professional:
+        return {**result, "status": "unknown_professional"}
+
+    # Branch on the analyzed intent
+    label = intent_analysis.intent if intent_analysis else None
+    if label == Intent.ACCEPT:
+        # Claim an open service call for this profession (one atomic round-trip)
+        service_call = await claim_open_service_call(
+            prisma,
+            await profession_registry.resolve_name(prisma, professional.professionId),
+            professional.id
+        )
+
+        if not service_call:
+            # Inform professional
+            await broadcaster.send(from_number, "אין כרגע קריאות פתוחות במערכת עבור המקצוע שלך. נעדכן אותך כשתגיע קריאה חדשה.")
+            return {**result, "status": "no_open_calls"}
+
+        matching_engine.invalidate()
+
+        # Confirm to professional
+        confirmation_msg = f"""תודה שקיבלת את העבודה!
+        כותרת: {service_call.title}
+        מיקום: {service_call.locations}
+        תאריך: {service_call.date}
         
-        איך היית מפרש את ההודעה הזאת? 
-        נסה להוציא את הכוונה המרכזית של השואל ולנסח את התשובה על פי הכוונה שמסתתרת בהודעה.
-        לדוגמא:
-        אם מדובר בבקשה לתיקון מדפים, אמור זאת באופן ברור.
-        שהתשובה שלך לא תכיל יותר מ2 שורות ותהיה הכי תמציתי שאפשר
+        נא לשלוח "COMPLETE" כאשר העבודה מסתיימת.
         """
+        await broadcaster.send(from_number, confirmation_msg)
+        return {**result, "status": "accepted", "service_call_id": service_call.id}
+
+    if label == Intent.COMPLETE:
+        # Find assigned service call for this professional
+        assignment = await prisma.servicecallassignment.find_first(
+            where={
+                "professionalId": professional.id,
+                "status": "ACCEPTED"
+            },
+            include={"serviceCall": True}
+        )
+
+        if not assignment:
+            return {**result, "status": "no_active_assignments"}
 
-        response = client.chat.completions.create(
-            model="gpt-4",  # או gpt-3.5-turbo אם זה המודל שאתה מעדיף
-            messages=[
-                {"role": "user", "content": full_prompt}
-            ]
+        # Update assignment and service call
+        await prisma.servicecallassignment.update(
+            where={"id": assignment.id},
+            data={"status": "COMPLETED"}
         )
-        print(type(response))
-        message = response.choices[0].message.content
-        return message
 
-    except Exception as e:
-        # Catching general exceptions to avoid the program crashing
-        print(f"Error occurred: {e}")
-        return "An unexpected error occurred. Please try again later."
-    
+        await prisma.servicecall.update(
+            where={"id": assignment.serviceCall.id},
+            data={"status": "COMPLETED"}
+        )
+        matching_engine.invalidate()
+
+        # Confirm to professional
+        await broadcaster.send(from_number, "תודה! השירות סומן כהושלם במערכת.")
+        return {**result, "status": "completed", "service_call_id": assignment.serviceCall.id}
+
+    if label == Intent.DECLINE:
+        return {**result, "status": "declined"}
+
+    if label == Intent.QUESTION:
+        return {**result, "status": "question"}
+
+    return {**result, "status": "other_message"}
+
+async def process_queued_message(job: dict) -> None:
+    """Queue worker: analyze a stored message, save its intent and run the workflow."""
+    intent_analysis = await intent_analyzer.analyze(job["text"])
+    await prisma.message.update(
+        where={"id": job["message_id"]},
+        data={"intent": intent_analysis.to_stored() if intent_analysis else None}
+    )
+    await process_message(job["from"], job["from_name"], job["text"], intent_analysis)
+
+message_queue = MessageQueue(process_queued_message, workers=MESSAGE_QUEUE_WORKERS)
+
+async def store_message(data: dict):
+    """Create a Message row; returns None if its provider id was already stored."""
+    try:
+        return await prisma.message.create(data=data)
+    except UniqueViolationError:
+        return None
 
 @app.post('/messages')
 async def receive_message(request: Request):
@@ -468,147 +765,88 @@ async def receive_message(request: Request):
         if not messages:
             raise HTTPException(status_code=400, detail="No messages found in the request.")
 
-        processed_messages = []
+        # Drop retried deliveries before any analysis or workflow
+        fresh = []
+        duplicates = []
         for message_data in messages:
-            from_number = message_data.get('from')
-            from_name = message_data.get('from_name', 'Unknown')
-            message_text = message_data.get('text', {}).get('body', '')
-
-            # Analyze message with ChatGPT
-            intent_analysis =  analyze_message_with_chatgpt(message_text)
-            print(intent_analysis)
-            # Store the message in database
-            await prisma.message.create(
-                data={
+            provider_id = message_data.get('id')
+            if provider_id and not message_ids.claim(provider_id):
+                duplicates.append(provider_id)
+            else:
+                fresh.append(message_data)
+
+        new_messages = []
+        # Rows fully handed over (enqueued or run through the workflow)
+        done = set()
+        try:
+            # Persist the raw messages first, so a retry the in-memory front
+            # missed is rejected by the unique provider id before any analysis
+            for message_data in fresh:
+                provider_id = message_data.get('id')
+                from_number = message_data.get('from')
+                from_name = message_data.get('from_name', 'Unknown')
+                message_text = message_data.get('text', {}).get('body', '')
+
+                stored = await store_message({
                     "fromNumber": from_number,
                     "fromName": from_name,
                     "body": message_text,
-                    "intent": intent_analysis  # Save analyzed intent
-                }
-            )
-
-            # Find professional by phone number
-            professional = await prisma.professional.find_first(
-                where={"phone": from_number}
-            )
-
-            if professional:
-                # Basic processing based on common keywords
-                message_text_upper = message_text.upper().strip()
-                if "ACCEPT" in message_text_upper or "מקבל" in message_text or "מסכים" in message_text:
-                    # Find open service call for this profession
-                    service_call = await prisma.servicecall.find_first(
-                        where={
-                            "profession": professional.profession,
-                            "status": "OPEN"
-                        }
-                    )
-                    
-                    if service_call:
-                        # Create assignment
-                        assignment = await prisma.servicecallassignment.create(
-                            data={
-                                "serviceCallId": service_call.id,
-                                "professionalId": professional.id,
-                                "status": "ACCEPTED"
-                            }
-                        )
-                        
-                        # Update service call status
-                        await prisma.servicecall.update(
-                            where={"id": service_call.id},
-                            data={"status": "ASSIGNED"}
-                        )
-                        
-                        processed_messages.append({
-                            "from": from_number,
-                            "name": from_name,
-                            "message": message_text,
-                            "intent": intent_analysis,
-                            "status": "accepted",
-                            "service_call_id": service_call.id
-                        })
-                        
-                        # Confirm to professional
-                        confirmation_msg = f"""תודה שקיבלת את העבודה!
-                        כותרת: {service_call.title}
-                        מיקום: {service_call.locations}
-                        תאריך: {service_call.date}
-                        
-                        נא לשלוח "COMPLETE" כאשר העבודה מסתיימת.
-                        """
-                        await send_message(from_number, confirmation_msg)
-                    else:
-                        processed_messages.append({
-                            "from": from_number,
-                            "name": from_name,
-                            "message": message_text,
-                            "intent": intent_analysis,
-                            "status": "no_open_calls"
-                        })
-                        
-                        # Inform professional
-                        await send_message(from_number, "אין כרגע קריאות פתוחות במערכת עבור המקצוע שלך. נעדכן אותך כשתגיע קריאה חדשה.")
-                
-                elif "COMPLETE" in message_text_upper or "הסתיים" in message_text or "סיימתי" in message_text:
-                    # Find assigned service call for this professional
-                    assignment = await prisma.servicecallassignment.find_first(
-                        where={
-                            "professionalId": professional.id,
-                            "status": "ACCEPTED"
-                        },
-                        include={"serviceCall": True}
-                    )
-                    
-                    if assignment:
-                        # Update assignment and service call
-                        await prisma.servicecallassignment.update(
-                            where={"id": assignment.id},
-                            data={"status": "COMPLETED"}
-                        )
-                        
-                        await prisma.servicecall.update(
-                            where={"id": assignment.serviceCall.id},
-                            data={"status": "COMPLETED"}
-                        )
-                        
-                        processed_messages.append({
-                            "from": from_number,
-                            "name": from_name,
-                            "message": message_text,
-                            "intent": intent_analysis,
-                            "status": "completed",
-                            "service_call_id": assignment.serviceCall.id
-                        })
-                        
-                        # Confirm to professional
-                        await send_message(from_number, "תודה! השירות סומן כהושלם במערכת.")
-                    else:
-                        processed_messages.append({
-                            "from": from_number,
-                            "name": from_name,
-                            "message": message_text,
-                            "intent": intent_analysis,
-                            "status": "no_active_assignments"
-                        })
-                else:
-                    processed_messages.append({
+                    "providerMessageId": provider_id,
+                })
+                if not stored:
+                    # Already stored by an earlier delivery: do not analyze or run the workflow again
+                    duplicates.append(provider_id)
+                    continue
+                new_messages.append((provider_id, stored.id, from_number, from_name, message_text))
+
+            if WEBHOOK_ACK_FIRST:
+                # Defer analysis + workflow to the queue
+                for _, message_id, from_number, from_name, message_text in new_messages:
+                    await message_queue.enqueue({
+                        "message_id": message_id,
                         "from": from_number,
-                        "name": from_name,
-                        "message": message_text,
-                        "intent": intent_analysis,
-                        "status": "other_message"
+                        "from_name": from_name,
+                        "text": message_text,
                     })
-            else:
-                processed_messages.append({
-                    "from": from_number,
-                    "name": from_name,
-                    "message": message_text,
-                    "intent": intent_analysis,
-                    "status": "unknown_professional"
-                })
+                    done.add(message_id)
+                return {
+                    "status": "accepted",
+                    "queued": [message_id for _, message_id, *_ in new_messages],
+                    "duplicates": duplicates
+                }
+
+            # Analyze all new messages in the batch concurrently with ChatGPT
+            intents = await intent_analyzer.analyze_many([message_text for *_, message_text in new_messages])
 
-        return {"status": "success", "processed": processed_messages}
+            processed_messages = []
+            for (_, message_id, from_number, from_name, message_text), intent_analysis in zip(new_messages, intents):
+                # Save analyzed intent
+                await prisma.message.update(
+                    where={"id": message_id},
+                    data={"intent": intent_analysis.to_stored() if intent_analysis else None}
+                )
+                processed_messages.append(
+                    await process_message(from_number, from_name, message_text, intent_analysis)
+                )
+                done.add(message_id)
+
+            return {"status": "success", "processed": processed_messages, "duplicates": duplicates}
+
+        except Exception:
+            # Undo the messages that were not handed over, so the provider's
+            # retry stores and processes them again instead of being rejected
+            unfinished = [message_id for _, message_id, *_ in new_messages if message_id not in done]
+            if unfinished:
+                try:
+                    await prisma.message.delete_many(where={"id": {"in": unfinished}})
+                except Exception as e:
+                    logger.error(f"Error removing unprocessed messages: {e}")
+            kept = set(duplicates) | {provider_id for provider_id, message_id, *_ in new_messages if message_id in done}
+            for message_data in fresh:
+                provider_id = message_data.get('id')
+                if provider_id and provider_id not in kept:
+                    message_ids.release(provider_id)
+            raise
 
     except HTTPException as he:
         logger.error(f"Error receiving messages: {he.detail}")
@@ -617,81 +855,71 @@ async def receive_message(request: Request):
         logger.error(f"Error receiving messages: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/queue/stats")
+async def get_queue_stats():
+    return message_queue.stats()
+
+@app.get("/intents/stats")
+async def get_intent_stats():
+    return intent_analyzer.stats()
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "phones": phone_cache.stats(),
+        "intents": intent_cache.stats(),
+        "message_ids": message_ids.stats(),
+    }
+
 # Add CSV upload endpoint
 
 @app.post("/professionals/upload-csv/")
-async def upload_professionals_csv(file: UploadFile = File(...)):
+async def upload_professionals_csv(file: UploadFile = File(...), job_id: Optional[str] = None):
     try:
-        contents = await file.read()
-        s = str(contents, 'utf-8')
-        csv_data = StringIO(s)
-        csv_reader = csv.reader(csv_data)
-
-        # Skip header row
-        next(csv_reader, None)
-
-        professionals_added = []
-        for row in csv_reader:
-            if len(row) >= 6:  # Ensure row has all required fields
-                name, phone, profession_name, available, location, area = row[:6]
-                available = available.lower() == 'true'
-
-                # Find or create profession
-                profession = await prisma.profession.upsert(
-                    where={"name": profession_name},
-                    data={
-                        'create': {'name': profession_name},
-                        'update': {'name': profession_name}
-                    }
-                )
-
-                # Check if professional already exists
-                existing = await prisma.professional.find_first(
-                    where={"phone": phone}
-                )
-
-                if not existing:
-                    professional = await prisma.professional.create(
-                        data={
-                            "name": name,
-                            "phone": phone,
-                            "profession": {
-                                'connect': {'id': profession.id}
-                            },
-                            "available": available,
-                            "location": location,
-                        }
-                    )
-                    professionals_added.append({"id": professional.id, "name": name})
+        # Register the import so its progress can be polled at GET /imports/{job_id}
+        job = create_import_job(prisma, profession_registry, job_id)
+        job.bytes_total = file.size
 
-        return {
-            "status": "success",
-            "professionals_added": len(professionals_added),
-            "details": professionals_added
-        }
+        try:
+            return await job.run(
+                iter_csv_rows(file, skip_header=True, on_read=job.add_bytes_read)
+            )
+        finally:
+            # New professionals may replace cached "unknown sender" entries
+            phone_cache.clear()
+            matching_engine.invalidate()
 
     except Exception as e:
         logger.error(f"Error uploading CSV: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/imports/{job_id}")
+async def get_import(job_id: str):
+    job = get_import_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job.to_dict()
+
 # Get messages endpoint
 @app.get("/messages/")
-async def get_messages():
+async def get_messages(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
     try:
         messages = await prisma.message.find_many(
             order=[{"timestamp": "desc"}],  # מיון לפי תאריך מהחדש לישן
-            take=100
+            take=limit
         )
-        
+
+        # Resolve all sender phones with at most a single query
+        professionals_by_phone = await find_professionals_by_phones(
+            msg.fromNumber for msg in messages if msg.fromNumber
+        )
+
         # Format messages for response
         formatted_messages = []
         for msg in messages:
             # Try to get professional name if available
-            professional = None
-            if msg.fromNumber:
-                professional = await prisma.professional.find_first(
-                    where={"phone": msg.fromNumber}
-                )
+            professional = professionals_by_phone.get(msg.fromNumber)
+            intent = IntentResult.from_stored(msg.intent)
             
             formatted_messages.append({
                 "id": msg.id,
@@ -699,7 +927,7 @@ async def get_messages():
                 "fromName": msg.fromName or (professional.name if professional else "Unknown"),
                 "body": msg.body,
                 "timestamp": msg.timestamp.isoformat(),
-                "intent": msg.intent,  # הוספת intent
+                "intent": intent.model_dump(exclude_none=True) if intent else None,
                 "professional": professional.name if professional else None
             })
         
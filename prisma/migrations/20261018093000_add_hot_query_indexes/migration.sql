@@ -0,0 +1,17 @@
+-- CreateIndex
+CREATE INDEX "Message_timestamp_idx" ON "Message"("timestamp");
+
+-- CreateIndex
+CREATE INDEX "Professional_phone_idx" ON "Professional"("phone");
+
+-- CreateIndex
+CREATE INDEX "Professional_professionId_available_location_idx" ON "Professional"("professionId", "available", "location");
+
+-- CreateIndex
+CREATE INDEX "ServiceCall_status_profession_idx" ON "ServiceCall"("status", "profession");
+
+-- CreateIndex
+CREATE INDEX "ServiceCall_locations_idx" ON "ServiceCall" USING GIN ("locations");
+
+-- CreateIndex
+CREATE INDEX "ServiceCallAssignment_professionalId_status_idx" ON "ServiceCallAssignment"("professionalId", "status");
@@ -0,0 +1,5 @@
+-- AlterTable
+ALTER TABLE "Message" ADD COLUMN     "contentHash" TEXT;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Message_contentHash_key" ON "Message"("contentHash");
@@ -0,0 +1,74 @@
+"""
+Backfills the Message table from WhatsApp chat exports.
+
+Reads export files directly, or a Parquet archive written by
+scripts/ingest_chat_exports.py, and inserts the messages in batches. Safe to
+re-run: messages already backfilled are skipped by their content hash.
+Intents are left empty unless --analyze is given.
+
+    python scripts/backfill_messages.py services/conv_/*.txt
+    python scripts/backfill_messages.py --archive data/chats --analyze
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyarrow.dataset as ds  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+from prisma import Prisma  # noqa: E402
+
+from services.chat_export import ChatArchive, ChatRecord, read_export  # noqa: E402
+from services.message_backfill import BACKFILL_CHUNK_SIZE, BACKFILL_CONCURRENCY, MessageBackfill  # noqa: E402
+
+
+def archive_records(directory: str) -> Iterator[ChatRecord]:
+    """Streams an archive's records, one source at a time, in file order."""
+    # Part files hold consecutive byte ranges of their source, written in order,
+    # so reading them one record batch at a time keeps memory use flat
+    for paths in ChatArchive(directory).parts().values():
+        for path in paths:
+            for batch in ds.dataset(path, format="parquet").to_batches(columns=["timestamp", "sender", "body"]):
+                for row in batch.to_pylist():
+                    yield ChatRecord(timestamp=row["timestamp"], sender=row["sender"], body=row["body"])
+
+
+async def main(args) -> None:
+    load_dotenv()
+    if args.archive:
+        records = archive_records(args.archive)
+    else:
+        records = (record for path in args.exports for record in read_export(path))
+
+    analyzer = None
+    if args.analyze:
+        from services.intent import intent_analyzer
+        analyzer = intent_analyzer
+        await analyzer.tokens.load_async()
+
+    prisma = Prisma()
+    await prisma.connect()
+    try:
+        backfill = MessageBackfill(prisma, args.chunk_size, args.concurrency, analyzer)
+        summary = await backfill.run(records)
+    finally:
+        await prisma.disconnect()
+    print(summary)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Backfill the Message table from WhatsApp chat exports.")
+    parser.add_argument("exports", nargs="*", help="export .txt files")
+    parser.add_argument("--archive", help="Parquet archive directory instead of export files")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY)
+    parser.add_argument("--analyze", action="store_true", help="analyze intents now instead of leaving them empty")
+    args = parser.parse_args()
+    if not args.exports and not args.archive:
+        parser.error("give export files or --archive")
+    asyncio.run(main(args))
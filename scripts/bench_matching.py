@@ -0,0 +1,74 @@
+"""
+Benchmark for the dispatch matching engine: times snapshot building and
+top-K ranking over a synthetic set of professionals.
+
+    python scripts/bench_matching.py [professionals]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.city_registry import city_registry  # noqa: E402
+from services.matching import CandidateSnapshot, MatchingEngine  # noqa: E402
+from services.proximity import city_proximity  # noqa: E402
+
+PROFESSIONS = 10
+ROUNDS = 200
+
+
+def synthetic(size: int):
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    cities = list(city_registry.names)
+    professionals = [
+        SimpleNamespace(
+            id=i,
+            name=f"Professional {i}",
+            phone=f"9725{i:08d}",
+            professionId=rng.randrange(PROFESSIONS),
+            available=rng.random() < 0.8,
+            location=rng.choice(cities),
+        )
+        for i in range(size)
+    ]
+    stats = [
+        {
+            "professionalId": p.id,
+            "status": status,
+            "_count": {"_all": rng.randint(1, 5)},
+            # ISO strings, as group_by returns them
+            "_max": {"createdAt": (now - timedelta(days=rng.uniform(0, 60))).isoformat().replace("+00:00", "Z")},
+        }
+        for p in professionals
+        for status in ("ACCEPTED", "COMPLETED")
+        if rng.random() < 0.5
+    ]
+    return professionals, stats
+
+
+def main() -> int:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    professionals, stats = synthetic(size)
+    engine = MatchingEngine(city_proximity)
+
+    start = time.perf_counter()
+    snapshot = CandidateSnapshot(professionals, stats, city_proximity)
+    print(f"snapshot: {size} professionals in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    cities = ["חיפה", "עכו"]
+    for top_k, radius in ((10, 25.0), (50, 100.0), (None, 100.0)):
+        start = time.perf_counter()
+        for i in range(ROUNDS):
+            result = engine.rank(snapshot, i % PROFESSIONS, cities, top_k, radius)
+        per_call = (time.perf_counter() - start) / ROUNDS * 1000
+        print(f"rank top_k={top_k} radius={radius:.0f} km: {len(result)} results, {per_call:.3f} ms/call")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark for GET /messages/: checks that the number of database queries
+does not grow with the page size.
+
+The Prisma client is replaced by an in-memory fake that counts every model
+call, so no database is needed.
+
+    python scripts/bench_messages_queries.py
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import main  # noqa: E402
+
+PAGE_SIZES = [1, 10, 100, 1000]
+
+
+class CountingModel:
+    def __init__(self, counter: dict, rows: list):
+        self.counter = counter
+        self.rows = rows
+
+    def _match(self, row, where):
+        for field, condition in (where or {}).items():
+            value = getattr(row, field)
+            if isinstance(condition, dict):
+                if "in" in condition and value not in condition["in"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    async def find_many(self, where=None, take=None, **kwargs):
+        self.counter["queries"] += 1
+        rows = [r for r in self.rows if self._match(r, where)]
+        return rows[:take] if take else rows
+
+    async def find_first(self, where=None, **kwargs):
+        self.counter["queries"] += 1
+        return next((r for r in self.rows if self._match(r, where)), None)
+
+
+class CountingPrisma:
+    def __init__(self, size: int):
+        self.counter = {"queries": 0}
+        now = datetime.now()
+        self.professional = CountingModel(self.counter, [
+            SimpleNamespace(id=i, name=f"Professional {i}", phone=f"9725{i:08d}")
+            for i in range(size)
+        ])
+        self.message = CountingModel(self.counter, [
+            SimpleNamespace(
+                id=i,
+                fromNumber=f"9725{i:08d}",
+                fromName=None,
+                body="מקבל",
+                timestamp=now - timedelta(seconds=i),
+                intent=None,
+            )
+            for i in range(size)
+        ])
+
+
+async def run() -> None:
+    counts = {}
+    for size in PAGE_SIZES:
+        fake = CountingPrisma(size)
+        main.prisma = fake
+        main.phone_cache.clear()
+        start = time.perf_counter()
+        result = await main.get_messages(limit=size)
+        elapsed = time.perf_counter() - start
+        assert len(result) == size
+        assert all(m["professional"] for m in result)
+        counts[size] = fake.counter["queries"]
+        print(f"page size {size:>5}: {counts[size]} queries, {elapsed * 1000:.2f} ms")
+
+    assert len(set(counts.values())) == 1, f"query count depends on page size: {counts}"
+    print("OK: query count is constant")
+
+    # A second page over the same senders is served from the phone cache
+    fake.counter["queries"] = 0
+    await main.get_messages(limit=PAGE_SIZES[-1])
+    assert fake.counter["queries"] == 1, fake.counter
+    print("OK: cached senders cost no extra query")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+"""
+Query-plan check for the hot queries in main.py.
+
+Runs EXPLAIN for each endpoint query against the database in DATABASE_URL
+(a local Postgres with the migrations applied) and checks that the plan uses
+the expected index. Sequential scans are disabled for the check, so the
+result does not depend on how much data the local tables hold.
+
+    python scripts/explain_queries.py
+"""
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from prisma import Prisma
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.assignments import CLAIM_OPEN_SERVICE_CALL  # noqa: E402
+
+# (endpoint, query, index expected in the plan)
+QUERIES = [
+    (
+        "POST /messages (sender lookup)",
+        """SELECT * FROM "Professional" WHERE "phone" = '972500000000'""",
+        "Professional_phone_idx",
+    ),
+    (
+        "GET /messages/ (sender names)",
+        """SELECT * FROM "Professional" WHERE "phone" IN ('972500000000', '972500000001')""",
+        "Professional_phone_idx",
+    ),
+    (
+        "GET /messages/",
+        """SELECT * FROM "Message" ORDER BY "timestamp" DESC LIMIT 100""",
+        "Message_timestamp_idx",
+    ),
+    (
+        "POST /professionals/by-profession-and-cities/",
+        """SELECT * FROM "Professional"
+           WHERE "professionId" = 1 AND "available" = true AND "location" IN ('חיפה', 'עכו')""",
+        "Professional_professionId_available_location_idx",
+    ),
+    (
+        "POST /messages (ACCEPT: claim open call for profession)",
+        CLAIM_OPEN_SERVICE_CALL.replace("$1", "'חשמלאי'").replace("$2", "1"),
+        "ServiceCall_status_profession_idx",
+    ),
+    (
+        "GET /service-calls/?city=",
+        """SELECT * FROM "ServiceCall" WHERE "locations" && ARRAY['חיפה', 'חיפא']""",
+        "ServiceCall_locations_idx",
+    ),
+    (
+        "POST /messages (COMPLETE: accepted assignment)",
+        """SELECT * FROM "ServiceCallAssignment"
+           WHERE "professionalId" = 1 AND "status" = 'ACCEPTED' LIMIT 1""",
+        "ServiceCallAssignment_professionalId_status_idx",
+    ),
+]
+
+
+async def explain(prisma: Prisma, query: str) -> str:
+    # SET LOCAL only lasts for the transaction, which pins a single connection
+    async with prisma.tx() as tx:
+        await tx.execute_raw("SET LOCAL enable_seqscan = off")
+        rows = await tx.query_raw(f"EXPLAIN {query}")
+    return "\n".join(row["QUERY PLAN"] for row in rows)
+
+
+async def main() -> int:
+    load_dotenv()
+    prisma = Prisma()
+    await prisma.connect()
+    failures = 0
+    try:
+        for endpoint, query, index in QUERIES:
+            plan = await explain(prisma, query)
+            ok = index in plan
+            failures += not ok
+            print(f"[{'OK' if ok else 'FAIL'}] {endpoint}: expected {index}")
+            if not ok:
+                print("    " + plan.replace("\n", "\n    "))
+    finally:
+        await prisma.disconnect()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
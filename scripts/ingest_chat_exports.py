@@ -0,0 +1,46 @@
+"""
+Parses WhatsApp chat exports into a Parquet archive.
+
+Each run only parses what was appended to an export since the previous run
+(use --full to parse everything again). The archive is a directory of
+Parquet files readable with pyarrow.dataset or pandas.
+
+    python scripts/ingest_chat_exports.py services/conv_/*.txt --out data/chats
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.chat_export import ChatArchive  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Parse WhatsApp chat exports into a Parquet archive.")
+    parser.add_argument("exports", nargs="+", help="export .txt files")
+    parser.add_argument("--out", default="data/chats", help="archive directory")
+    parser.add_argument("--full", action="store_true", help="parse whole files, not only appended bytes")
+    args = parser.parse_args()
+
+    archive = ChatArchive(args.out)
+    total_rows = 0
+    total_bytes = 0
+    start = time.perf_counter()
+    for path in args.exports:
+        rows = archive.ingest(path, incremental=not args.full)
+        total_rows += rows
+        total_bytes += os.path.getsize(path)
+        print(f"{path}: {rows} new messages")
+    elapsed = time.perf_counter() - start
+    print(
+        f"{total_rows} messages from {len(args.exports)} files in {elapsed:.2f} s "
+        f"({total_bytes / 1e6 / elapsed:.1f} MB/s scanned)"
+    )
+    print(f"archive: {archive.dataset().count_rows()} messages in {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+"""
+Replay benchmark for the message pipeline.
+
+Parses the WhatsApp exports in services/conv_ into webhook payloads and posts
+them to POST /messages of the in-process FastAPI app, at a configurable rate
+and concurrency. WhatsApp sends and OpenAI completions are stubbed with a
+configurable latency. Reports throughput, request latency percentiles and
+database queries per message.
+
+By default the database is an in-memory fake (no Postgres needed). With
+--postgres the app uses the database in DATABASE_URL; every sender of the
+replayed chats is created as a professional if missing.
+
+    python scripts/replay_benchmark.py --limit 2000 --rate 200 --concurrency 32
+    python scripts/replay_benchmark.py --postgres --openai-url http://127.0.0.1:8100/v1
+"""
+import argparse
+import asyncio
+import functools
+import glob
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Replays should neither read nor fill the on-disk intent cache
+os.environ.setdefault("INTENT_CACHE_PATH", "")
+
+import httpx  # noqa: E402
+from openai import AsyncOpenAI  # noqa: E402
+
+import main  # noqa: E402
+from services.chat_export import ChatRecord, read_export  # noqa: E402
+
+EXPORTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "services", "conv_", "*.txt")
+
+# Profession guessed from the words in a sender's display name
+PROFESSION_WORDS = {
+    "חשמל": "חשמלאי",
+    "אינסטלטור": "אינסטלטור",
+    "צבע": "צבעי",
+    "שיפוצים": "שיפוצניק",
+    "מחשבים": "טכנאי מחשבים",
+    "כביסה": "טכנאי מכונות כביסה",
+    "מקררים": "טכנאי מקררים",
+    "דודי שמש": "טכנאי דודי שמש",
+    "דלתות": "טכנאי דלתות",
+}
+DEFAULT_PROFESSION = "הנדימן"
+
+
+def sender_phone(sender: str) -> str:
+    """A stable fake Israeli mobile number for a sender name."""
+    digest = int(hashlib.sha256(sender.encode("utf-8")).hexdigest(), 16)
+    return f"9725{digest % 10 ** 8:08d}"
+
+
+def sender_profession(sender: str) -> str:
+    return next((p for word, p in PROFESSION_WORDS.items() if word in sender), DEFAULT_PROFESSION)
+
+
+def load_records(limit: int) -> List[ChatRecord]:
+    records = [r for path in sorted(glob.glob(EXPORTS)) for r in read_export(path) if r.body]
+    records.sort(key=lambda r: r.timestamp)
+    return records[:limit] if limit else records
+
+
+# --- In-memory database -----------------------------------------------------
+
+
+class FakeModel:
+    """Minimal in-memory stand-in for a Prisma model, counting every call."""
+
+    def __init__(self, counter: dict, defaults: dict = None):
+        self.counter = counter
+        self.defaults = defaults or {}
+        self.rows = []
+
+    def _match(self, row, where) -> bool:
+        for field, condition in (where or {}).items():
+            value = getattr(row, field, None)
+            if isinstance(condition, dict):
+                if "in" in condition and value not in condition["in"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def _insert(self, data: dict):
+        row = SimpleNamespace(id=len(self.rows) + 1, **{**self.defaults, **data})
+        self.rows.append(row)
+        return row
+
+    async def create(self, data: dict, **kwargs):
+        self.counter["queries"] += 1
+        return self._insert(data)
+
+    async def find_many(self, where=None, take=None, **kwargs):
+        self.counter["queries"] += 1
+        rows = [r for r in self.rows if self._match(r, where)]
+        return rows[:take] if take else rows
+
+    async def find_first(self, where=None, **kwargs):
+        self.counter["queries"] += 1
+        return next((r for r in self.rows if self._match(r, where)), None)
+
+    async def find_unique(self, where=None, **kwargs):
+        return await self.find_first(where)
+
+    async def update(self, where, data, **kwargs):
+        self.counter["queries"] += 1
+        row = next((r for r in self.rows if self._match(r, where)), None)
+        if row:
+            for field, value in data.items():
+                setattr(row, field, value)
+        return row
+
+
+class FakePrisma:
+    def __init__(self):
+        self.counter = {"queries": 0}
+        now = datetime.now()
+        self.profession = FakeModel(self.counter)
+        self.professional = FakeModel(self.counter, {"available": True, "location": None})
+        self.message = FakeModel(self.counter, {"timestamp": now, "intent": None})
+        self.servicecall = FakeModel(self.counter, {"status": "OPEN", "locations": [], "date": now})
+        self.servicecallassignment = FakeModel(self.counter, {"createdAt": now})
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def query_first(self, query, profession, professional_id, **kwargs):
+        # The atomic ACCEPT claim (services.assignments) is one statement
+        self.counter["queries"] += 1
+        call = next((c for c in self.servicecall.rows if c.status == "OPEN" and c.profession == profession), None)
+        if call:
+            call.status = "ASSIGNED"
+            self.servicecallassignment._insert(
+                {"serviceCallId": call.id, "professionalId": professional_id, "status": "ACCEPTED", "serviceCall": call}
+            )
+        return call
+
+    def seed(self, senders, open_calls: int) -> None:
+        professions = {}
+        for sender in senders:
+            name = sender_profession(sender)
+            if name not in professions:
+                professions[name] = self.profession._insert({"name": name})
+            self.professional._insert(
+                {"name": sender, "phone": sender_phone(sender), "professionId": professions[name].id}
+            )
+        for name in professions:
+            for i in range(open_calls):
+                self.servicecall._insert({"title": f"{name} #{i}", "description": "", "profession": name})
+
+
+async def seed_postgres(prisma, senders) -> None:
+    for sender in senders:
+        phone = sender_phone(sender)
+        if await prisma.professional.find_first(where={"phone": phone}):
+            continue
+        profession = await prisma.profession.upsert(
+            where={"name": sender_profession(sender)},
+            data={"create": {"name": sender_profession(sender)}, "update": {}}
+        )
+        await prisma.professional.create(data={"name": sender, "phone": phone, "professionId": profession.id})
+
+
+def count_postgres_queries(prisma) -> dict:
+    """Counts the queries the real Prisma client sends to its engine."""
+    counter = {"queries": 0}
+    execute = prisma._execute
+
+    @functools.wraps(execute)
+    async def counting_execute(*args, **kwargs):
+        counter["queries"] += 1
+        return await execute(*args, **kwargs)
+
+    prisma._execute = counting_execute
+    return counter
+
+
+# --- Stubbed external services ----------------------------------------------
+
+
+class StubCompletions:
+    """Answers intent prompts like scripts/stub_openai_server.py, in process."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def create(self, model, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        texts = json.loads(messages[-1]["content"])
+        results = [{"intent": "question" if "?" in t else "other", "summary": "stub"} for t in texts]
+        content = json.dumps({"results": results})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def stub_whatsapp(latency: float, sent: list):
+    async def send_message(to: str, message: str) -> bool:
+        await asyncio.sleep(latency)
+        sent.append(to)
+        return True
+
+    return send_message
+
+
+# --- Replay -------------------------------------------------------------------
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def replay(args) -> None:
+    records = load_records(args.limit)
+    senders = sorted({r.sender for r in records})
+    print(f"Replaying {len(records)} messages from {len(senders)} senders")
+
+    if args.postgres:
+        counter = count_postgres_queries(main.prisma)
+    else:
+        fake = FakePrisma()
+        fake.seed(senders, args.open_calls)
+        main.prisma = fake
+        counter = fake.counter
+
+    if args.openai_url:
+        main.intent_analyzer.llm.client = AsyncOpenAI(base_url=args.openai_url, api_key="stub", max_retries=0)
+    else:
+        main.intent_analyzer.llm.client = SimpleNamespace(
+            chat=SimpleNamespace(completions=StubCompletions(args.openai_latency_ms / 1000))
+        )
+    sent = []
+    main.broadcaster.sender = stub_whatsapp(args.whatsapp_latency_ms / 1000, sent)
+
+    payloads = [
+        {
+            "messages": [
+                {
+                    "id": f"replay-{i + j}",
+                    "from": sender_phone(r.sender),
+                    "from_name": r.sender,
+                    "text": {"body": r.body},
+                }
+                for j, r in enumerate(records[i:i + args.batch])
+            ]
+        }
+        for i in range(0, len(records), args.batch)
+    ]
+    # Redeliver some payloads, as the provider does when a webhook call fails
+    retries = random.Random(0).sample(payloads, int(len(payloads) * args.retry_rate))
+    payloads += retries
+
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with main.app.router.lifespan_context(main.app):
+        if args.postgres:
+            await seed_postgres(main.prisma, senders)
+        counter["queries"] = 0
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+
+            async def post(payload, due):
+                nonlocal errors
+                async with semaphore:
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    sent_at = time.perf_counter()
+                    response = await client.post("/messages", json=payload)
+                    latencies.append(time.perf_counter() - sent_at)
+                    errors += response.status_code >= 400
+
+            start = time.perf_counter()
+            interval = args.batch / args.rate if args.rate else 0
+            await asyncio.gather(*(post(p, start + i * interval) for i, p in enumerate(payloads)))
+            acked = time.perf_counter() - start
+        # In ack-first mode the messages are still being processed
+        await main.message_queue.join()
+        elapsed = time.perf_counter() - start
+
+    intents = main.intent_analyzer.stats()
+    cache = main.intent_cache.stats()
+    print(f"requests:        {len(payloads)} ({errors} errors), up to {args.batch} message(s) each")
+    print(f"throughput:      {len(records) / elapsed:.1f} msg/s ({elapsed:.2f} s, acked in {acked:.2f} s)")
+    print(
+        f"latency:         p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+        f"p95 {percentile(latencies, 95) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms"
+    )
+    print(f"db queries:      {counter['queries']} ({counter['queries'] / len(records):.2f} per message)")
+    print(
+        f"intents:         {intents['rule_hits']} by rules, {intents['llm_calls']} by LLM "
+        f"in {intents['llm_batches']} completions, {cache['memory_hits']} from cache, "
+        f"{intents['fallbacks']} fallbacks"
+    )
+    print(f"whatsapp sends:  {len(sent)}")
+    print(f"redeliveries:    {len(retries)} payloads, {main.message_ids.stats()['duplicates']} messages rejected")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Replay chat exports through POST /messages.")
+    parser.add_argument("--limit", type=int, default=0, help="messages to replay (0 for all)")
+    parser.add_argument("--rate", type=float, default=0, help="messages per second (0 for as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight")
+    parser.add_argument("--batch", type=int, default=1, help="messages per webhook payload")
+    parser.add_argument("--retry-rate", type=float, default=0, help="share of payloads delivered twice")
+    parser.add_argument("--open-calls", type=int, default=20, help="open service calls per profession (fake db)")
+    parser.add_argument("--openai-latency-ms", type=float, default=300)
+    parser.add_argument("--whatsapp-latency-ms", type=float, default=50)
+    parser.add_argument("--openai-url", help="use an OpenAI-compatible server, e.g. scripts/stub_openai_server.py")
+    parser.add_argument("--postgres", action="store_true", help="use the database in DATABASE_URL")
+    args = parser.parse_args()
+    asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,101 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Answers POST /v1/chat/completions with canned intents, with configurable
+latency and failure rate, so the LLM client's timeouts, retries and circuit
+breaker can be exercised without network access or API spend.
+
+    python scripts/stub_openai_server.py --port 8100 --latency-ms 50 --error-rate 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub uvicorn main:app
+
+GET /stats returns the number of requests served and failed. POST /config
+changes latency_ms, error_rate and hang_rate while the server runs.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="OpenAI stub")
+
+config = {"latency_ms": 0.0, "error_rate": 0.0, "hang_rate": 0.0}
+counters = {"requests": 0, "errors": 0, "hangs": 0}
+
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-stub-{counters['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    counters["requests"] += 1
+
+    if random.random() < config["hang_rate"]:
+        # Longer than any sensible client timeout
+        counters["hangs"] += 1
+        await asyncio.sleep(3600)
+    await asyncio.sleep(config["latency_ms"] / 1000)
+    if random.random() < config["error_rate"]:
+        counters["errors"] += 1
+        return JSONResponse(
+            status_code=503,
+            content={"error": {"message": "stub overloaded", "type": "server_error"}}
+        )
+
+    # The intent analyzer sends the messages as a JSON list
+    try:
+        messages = json.loads(body["messages"][-1]["content"])
+    except ValueError:
+        messages = None
+    if isinstance(messages, list):
+        results = [{"intent": "question" if "?" in str(m) else "other", "summary": "stub intent"} for m in messages]
+        content = json.dumps({"results": results})
+    else:
+        content = "stub intent"
+    return _completion(body.get("model", "stub"), content)
+
+
+@app.get("/stats")
+async def stats():
+    return {**counters, **config}
+
+
+@app.post("/config")
+async def update_config(values: dict):
+    config.update({k: float(v) for k, v in values.items() if k in config})
+    return config
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of requests that never answer")
+    args = parser.parse_args()
+    config.update(latency_ms=args.latency_ms, error_rate=args.error_rate, hang_rate=args.hang_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from prisma import Prisma
+from prisma.models import ServiceCall
+
+# Claims the oldest open call of a profession and records the assignment in
+# one statement. Calls locked by a concurrent claim are skipped rather than
+# waited on, so two simultaneous ACCEPTs never get the same call.
+CLAIM_OPEN_SERVICE_CALL = """
+WITH claimed AS (
+    UPDATE "ServiceCall"
+    SET "status" = 'ASSIGNED'
+    WHERE "id" = (
+        SELECT "id" FROM "ServiceCall"
+        WHERE "status" = 'OPEN' AND "profession" = $1
+        ORDER BY "id"
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    AND "status" = 'OPEN'
+    RETURNING *
+), assignment AS (
+    INSERT INTO "ServiceCallAssignment" ("serviceCallId", "professionalId", "status")
+    SELECT "id", $2, 'ACCEPTED' FROM claimed
+)
+SELECT * FROM claimed
+"""
+
+
+async def claim_open_service_call(prisma: Prisma, profession: str, professional_id: int) -> Optional[ServiceCall]:
+    """
+    Atomically assigns an open service call to a professional.
+
+    Args:
+        prisma (Prisma): Connected client.
+        profession (str): Profession name of the professional.
+        professional_id (int): Professional accepting the call.
+
+    Returns:
+        Optional[ServiceCall]: The claimed call, now ASSIGNED, or None if no
+        open call was available.
+    """
+    return await prisma.query_first(CLAIM_OPEN_SERVICE_CALL, profession, professional_id, model=ServiceCall)
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of sends in flight at once
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("BROADCAST_MAX_IN_FLIGHT", "20"))
+# Provider quota in messages per second (0 disables rate limiting)
+DEFAULT_RATE_PER_SECOND = float(os.getenv("BROADCAST_RATE_PER_SECOND", "20"))
+# Number of finished jobs kept for polling
+MAX_STORED_JOBS = 100
+
+
+class RateLimiter:
+    """Spaces out acquisitions so that at most `rate` happen per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class BroadcastJob:
+    """Progress and per-recipient delivery report of a single broadcast."""
+
+    def __init__(self, recipients: List[dict], body: str):
+        self.id = uuid.uuid4().hex
+        self.recipients = recipients
+        self.body = body
+        self.status = "PENDING"
+        self.results: List[dict] = []
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for r in self.results if r["delivered"])
+
+    @property
+    def failed(self) -> int:
+        return len(self.results) - self.sent
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.recipients),
+            "sent": self.sent,
+            "failed": self.failed,
+            "pending": len(self.recipients) - len(self.results),
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "results": self.results,
+        }
+
+
+class Broadcaster:
+    """
+    Fans out a message to many recipients concurrently.
+
+    At most `max_in_flight` sends of a job run at the same time. The
+    `rate_per_second` quota is shared by all jobs and by single messages
+    sent through `send()`.
+    """
+
+    def __init__(
+        self,
+        sender: Callable[[str, str], Awaitable[bool]],
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+    ):
+        self.sender = sender
+        self.max_in_flight = max_in_flight
+        self.rate_per_second = rate_per_second
+        self.jobs: "OrderedDict[str, BroadcastJob]" = OrderedDict()
+        self._tasks: set = set()
+        self._limiter: Optional[RateLimiter] = None
+
+    @property
+    def limiter(self) -> RateLimiter:
+        # Created on first use, inside the running event loop
+        if self._limiter is None:
+            self._limiter = RateLimiter(self.rate_per_second)
+        return self._limiter
+
+    async def send(self, to: str, body: str) -> bool:
+        """Sends a single message within the shared rate limit."""
+        await self.limiter.acquire()
+        return await self.sender(to, body)
+
+    def create_job(self, recipients: List[dict], body: str) -> BroadcastJob:
+        """
+        Registers a new broadcast job.
+
+        Args:
+            recipients (List[dict]): Recipients, each with at least a "phone" key.
+            body (str): The message to send.
+
+        Returns:
+            BroadcastJob: The pending job.
+        """
+        job = BroadcastJob(recipients, body)
+        self.jobs[job.id] = job
+        while len(self.jobs) > MAX_STORED_JOBS:
+            self.jobs.popitem(last=False)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[BroadcastJob]:
+        return self.jobs.get(job_id)
+
+    async def run(self, job: BroadcastJob) -> BroadcastJob:
+        """Sends the job's message to all of its recipients."""
+        job.status = "RUNNING"
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        limiter = self.limiter
+
+        async def deliver(recipient: dict) -> None:
+            async with semaphore:
+                await limiter.acquire()
+                error = None
+                try:
+                    delivered = await self.sender(recipient["phone"], job.body)
+                except Exception as e:
+                    delivered = False
+                    error = str(e)
+                job.results.append({**recipient, "delivered": delivered, "error": error})
+
+        await asyncio.gather(*(deliver(r) for r in job.recipients))
+        job.status = "COMPLETED"
+        job.finished_at = datetime.now()
+        logger.info(f"Broadcast {job.id} finished: {job.sent} sent, {job.failed} failed.")
+        return job
+
+    def start(self, job: BroadcastJob) -> asyncio.Task:
+        """Runs the job in the background."""
+        task = asyncio.create_task(self.run(job))
+        # Keep a reference so the task is not garbage collected mid-run
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# "[19.5.2023, 13:15:44] sender: text", optionally preceded by a direction
+# mark (U+200E/U+200F). Matched on the raw UTF-8 bytes.
+_HEADER = re.compile(
+    rb"^(?:\xe2\x80[\x8e\x8f])?\[(\d{1,2})\.(\d{1,2})\.(\d{4}), (\d{1,2}):(\d{2}):(\d{2})\] ([^:\n]+): ",
+    re.MULTILINE
+)
+_DIRECTION_MARKS = "‎‏‪‫‬"
+
+# Rows per Parquet row group (bounds the memory used while writing)
+ROW_GROUP_SIZE = int(os.getenv("CHAT_EXPORT_ROW_GROUP_SIZE", "50000"))
+# Bytes hashed to recognize a file that was replaced rather than appended to
+HEAD_BYTES = 4096
+
+PARQUET_SCHEMA = pa.schema([
+    ("source", pa.string()),
+    ("offset", pa.int64()),
+    ("timestamp", pa.timestamp("s")),
+    ("sender", pa.string()),
+    ("body", pa.string()),
+])
+
+
+@dataclass
+class ChatRecord:
+    """A single message of a WhatsApp chat export."""
+
+    timestamp: datetime
+    sender: str
+    body: str
+
+
+def _record(data, match, end: int) -> ChatRecord:
+    day, month, year, hour, minute, second = map(int, match.groups()[:6])
+    return ChatRecord(
+        timestamp=datetime(year, month, day, hour, minute, second),
+        sender=match.group(7).decode("utf-8").strip(_DIRECTION_MARKS + " "),
+        body=data[match.end():end].decode("utf-8", errors="replace").strip(_DIRECTION_MARKS + " \r\n"),
+    )
+
+
+def iter_export(path: str, start: int = 0) -> Iterator[Tuple[int, int, ChatRecord]]:
+    """
+    Streams the messages of a WhatsApp chat export.
+
+    The file is memory-mapped and scanned for "[d.m.yyyy, hh:mm:ss] sender: "
+    headers; lines up to the next header belong to the message body. Only
+    one message is decoded at a time, so memory use does not grow with the
+    file. The last message is held back while the file does not end with a
+    newline, as it may still be being written.
+
+    Args:
+        path (str): Export file.
+        start (int): Byte offset to start from (a message boundary).
+
+    Yields:
+        Tuple[int, int, ChatRecord]: Start and end byte offsets of each
+        message, and the message.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= start:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            previous = None
+            for match in _HEADER.finditer(data, start):
+                if previous is not None:
+                    yield previous.start(), match.start(), _record(data, previous, match.start())
+                previous = match
+            if previous is not None and data[-1:] == b"\n":
+                yield previous.start(), len(data), _record(data, previous, len(data))
+
+
+def read_export(path: str) -> Iterator[ChatRecord]:
+    """Parses a WhatsApp chat export file (see `iter_export`)."""
+    for _, _, record in iter_export(path):
+        yield record
+
+
+def write_parquet(rows: Iterable[Tuple[str, int, ChatRecord]], path: str, row_group_size: int = ROW_GROUP_SIZE) -> int:
+    """
+    Writes (source, offset, record) rows to a Parquet file, one row group at a time.
+
+    Returns:
+        int: Number of rows written.
+    """
+    count = 0
+    columns = {name: [] for name in PARQUET_SCHEMA.names}
+
+    def flush(writer):
+        writer.write_table(pa.table(columns, schema=PARQUET_SCHEMA))
+        for values in columns.values():
+            values.clear()
+
+    with pq.ParquetWriter(path, PARQUET_SCHEMA) as writer:
+        for source, offset, record in rows:
+            columns["source"].append(source)
+            columns["offset"].append(offset)
+            columns["timestamp"].append(record.timestamp)
+            columns["sender"].append(record.sender)
+            columns["body"].append(record.body)
+            count += 1
+            if len(columns["body"]) >= row_group_size:
+                flush(writer)
+        if columns["body"] or not count:
+            flush(writer)
+    return count
+
+
+class ChatArchive:
+    """
+    Parquet dataset of parsed chat exports, ingested incrementally.
+
+    Each ingestion writes a new part file to `directory`. The byte offset
+    reached in every source file is kept in `_state.json`, so re-ingesting an
+    export that has grown only parses the appended bytes. A source whose
+    first bytes changed was replaced, and is parsed again from the start.
+    """
+
+    STATE_FILE = "_state.json"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.state_path = os.path.join(directory, self.STATE_FILE)
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                self.state = json.load(f)
+        else:
+            self.state = {}
+
+    @staticmethod
+    def _head(path: str) -> str:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read(HEAD_BYTES)).hexdigest()
+
+    def ingest(self, path: str, incremental: bool = True) -> int:
+        """
+        Parses `path` into a new part file.
+
+        Args:
+            path (str): Export file.
+            incremental (bool): Only parse bytes appended since the last ingestion.
+
+        Returns:
+            int: Number of new rows.
+        """
+        source = os.path.basename(path)
+        head = self._head(path)
+        previous = self.state.get(source)
+        start = 0
+        if incremental and previous and previous["head"] == head:
+            start = previous["offset"]
+
+        end = start
+        part = os.path.join(self.directory, f"{source}.{start}.parquet")
+
+        def rows():
+            nonlocal end
+            for offset, record_end, record in iter_export(path, start):
+                end = record_end
+                yield source, offset, record
+
+        count = write_parquet(rows(), part)
+        if not count:
+            os.remove(part)
+            return 0
+
+        if start == 0:
+            # A full parse supersedes the earlier parts of this source
+            for name in os.listdir(self.directory):
+                if name.startswith(f"{source}.") and name.endswith(".parquet") and name != os.path.basename(part):
+                    os.remove(os.path.join(self.directory, name))
+
+        self.state[source] = {"offset": end, "head": head}
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.state_path)
+        return count
+
+    def parts(self) -> Dict[str, List[str]]:
+        """Part files of each source, in the order of their start offset."""
+        parts = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".parquet"):
+                continue
+            source, start, _ = name.rsplit(".", 2)
+            parts.setdefault(source, []).append((int(start), os.path.join(self.directory, name)))
+        return {source: [path for _, path in sorted(files)] for source, files in sorted(parts.items())}
+
+    def dataset(self) -> ds.Dataset:
+        """The archive as a pyarrow dataset (filterable by source, sender or timestamp)."""
+        return ds.dataset(self.directory, format="parquet", schema=PARQUET_SCHEMA, exclude_invalid_files=True)
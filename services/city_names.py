@@ -0,0 +1,144 @@
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+from services.city_registry import City, CityRegistry, city_registry
+
+# Minimum trigram similarity (Dice coefficient) for a fuzzy match
+MIN_SIMILARITY = 0.5
+# Minimum lead of the best fuzzy match over the runner-up
+MIN_MARGIN = 0.1
+
+# Common names that differ from the official city name
+ALIASES = {
+    "תל אביב": "תל אביב-יפו",
+    "תא": "תל אביב-יפו",
+    "יפו": "תל אביב-יפו",
+    "מודיעין": "מודיעין-מכבים-רעות",
+    "נצרת עילית": "נוף הגליל",
+    "יהוד": "יהוד-מונוסון",
+    "מעלות": "מעלות-תרשיחא",
+    "פתח תקוה": "פתח תקווה",
+    "פת": "פתח תקווה",
+    "ראשלצ": "ראשון לציון",
+    "ב\"ש": "באר שבע",
+}
+
+_FINAL_LETTERS = str.maketrans("ךםןףץ", "כמנפצ")
+_FOOTNOTE = re.compile(r"\[[^\]]*\]")
+_SEPARATORS = re.compile(r"[-־‐-―_/,.]+")
+_QUOTES = re.compile(r"[\"'`׳״‘’“”]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_city_name(text: str) -> str:
+    """
+    Reduces a free-text city name to a comparison key.
+
+    Removes niqqud, RTL marks, footnotes and quotes, treats hyphens (including
+    the Hebrew maqaf) as spaces, folds final letters and collapses whitespace.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c) and unicodedata.category(c) != "Cf")
+    text = _FOOTNOTE.sub("", text)
+    text = _QUOTES.sub("", text)
+    text = _SEPARATORS.sub(" ", text)
+    text = _SPACES.sub(" ", text).strip().lower()
+    return text.translate(_FINAL_LETTERS)
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CityNameIndex:
+    """
+    Resolves free-text locations to registry cities.
+
+    Lookups try, in order: the exact normalized name, a known alias, a unique
+    word prefix ("ראשון" matches, the ambiguous "באר" does not), and finally
+    the most similar name by character trigrams.
+
+    The registry does not list every town, so fuzzy matches can be a
+    different, similarly spelled city ("אבן יהודה" resolves to "אור יהודה").
+    They are only used for query-time lookups such as distances; names that
+    are stored or filtered on are canonicalized without them.
+    """
+
+    def __init__(self, registry: CityRegistry, aliases: Dict[str, str] = ALIASES):
+        self.exact: Dict[str, City] = {}
+        for name, city in registry.by_name.items():
+            self.exact.setdefault(normalize_city_name(name), city)
+        for alias, name in aliases.items():
+            self.exact.setdefault(normalize_city_name(alias), registry.by_name[name])
+
+        self.prefixes: Dict[str, Set[int]] = {}
+        self.trigrams: Dict[str, List[City]] = {}
+        self._trigram_counts: Dict[int, int] = {}
+        self._cities: Dict[int, City] = {}
+        for city in registry:
+            key = normalize_city_name(city.name)
+            self._cities[city.id] = city
+            for end in range(1, len(key) + 1):
+                if end == len(key) or key[end] == " ":
+                    self.prefixes.setdefault(key[:end], set()).add(city.id)
+            grams = _trigrams(key)
+            self._trigram_counts[city.id] = len(grams)
+            for gram in grams:
+                self.trigrams.setdefault(gram, []).append(city)
+
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+
+    def _resolve(self, text: str, fuzzy: bool = True) -> Optional[City]:
+        key = normalize_city_name(text)
+        if not key:
+            return None
+
+        city = self.exact.get(key)
+        if city:
+            return city
+
+        ids = self.prefixes.get(key)
+        if ids:
+            # An ambiguous prefix is not guessed at
+            return self._cities[next(iter(ids))] if len(ids) == 1 else None
+        if not fuzzy:
+            return None
+
+        grams = _trigrams(key)
+        shared = Counter(city.id for gram in grams for city in self.trigrams.get(gram, ()))
+        scores = sorted(
+            ((2 * count / (len(grams) + self._trigram_counts[city_id]), city_id)
+             for city_id, count in shared.items()),
+            reverse=True
+        )
+        if not scores or scores[0][0] < MIN_SIMILARITY:
+            return None
+        # Several near-equal candidates mean the text is ambiguous
+        if len(scores) > 1 and scores[0][0] - scores[1][0] < MIN_MARGIN:
+            return None
+        return self._cities[scores[0][1]]
+
+    def canonicalize(self, text: Optional[str], fuzzy: bool = False) -> Optional[str]:
+        """
+        Returns the official city name for `text`, or the trimmed text if unknown.
+
+        Args:
+            text (Optional[str]): Free-text location.
+            fuzzy (bool): Also accept trigram matches. Off by default, as the
+                result is usually stored.
+        """
+        if text is None:
+            return None
+        city = self.resolve(text, fuzzy)
+        return city.name if city else text.strip()
+
+    def canonicalize_many(self, texts: Iterable[str]) -> List[str]:
+        """Canonicalizes a list of locations, dropping duplicates but keeping order."""
+        return list(dict.fromkeys(self.canonicalize(t) for t in texts if t and t.strip()))
+
+
+city_names = CityNameIndex(city_registry)
@@ -0,0 +1,122 @@
+import re
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from cities import israeli_cities
+
+# Source column names in cities.israeli_cities
+ID_COLUMN = "מספר"
+NAME_COLUMN = "שם העיר"
+DISTRICT_COLUMN = "מחוז"
+AREA_COLUMN = "שטח תחום השיפוט (בדונמים)"
+DENSITY_COLUMN = "צפיפות אוכלוסין (מס' תושבים לקמ\"ר)[דרוש מקור]"
+GROWTH_COLUMN = "גידול אוכלוסייה שנתי"
+RANK_COLUMN = "דירוג חברתי- כלכלי[5]"
+MAYOR_COLUMN = "ראש העיר"
+POPULATION_COLUMNS = {
+    2024: "מספר תושבים 2024",
+    2022: "מספר תושבים 2022",
+    2020: "מספר תושבים 2020",
+    2018: "מספר תושבים 2018",
+    2016: "מספר תושבים 2016",
+}
+
+# Wikipedia footnote markers such as "[22]"
+_FOOTNOTE = re.compile(r"\[[^\]]*\]")
+
+
+def _clean(value: str) -> str:
+    return _FOOTNOTE.sub("", value or "").replace("\u200f", "").strip()
+
+
+def _parse_int(value: str) -> Optional[int]:
+    value = _clean(value).replace(",", "")
+    return int(value) if value else None
+
+
+def _parse_float(value: str) -> Optional[float]:
+    value = _clean(value).replace(",", "").rstrip("%")
+    return float(value) if value else None
+
+
+class City:
+    """A city with its numeric fields already parsed."""
+
+    __slots__ = (
+        "id",
+        "name",
+        "district",
+        "population",
+        "populations",
+        "area_dunams",
+        "density",
+        "growth_rate",
+        "socioeconomic_rank",
+        "mayor",
+    )
+
+    def __init__(self, row: dict):
+        self.id: int = int(row[ID_COLUMN])
+        self.name: str = _clean(row[NAME_COLUMN])
+        self.district: str = _clean(row[DISTRICT_COLUMN])
+        # Population by year, newest first
+        self.populations: Tuple[Tuple[int, Optional[int]], ...] = tuple(
+            (year, _parse_int(row.get(column, ""))) for year, column in POPULATION_COLUMNS.items()
+        )
+        self.population: Optional[int] = self.populations[0][1]
+        self.area_dunams: Optional[int] = _parse_int(row.get(AREA_COLUMN, ""))
+        self.density: Optional[int] = _parse_int(row.get(DENSITY_COLUMN, ""))
+        self.growth_rate: Optional[float] = _parse_float(row.get(GROWTH_COLUMN, ""))  # percent per year
+        self.socioeconomic_rank: Optional[int] = _parse_int(row.get(RANK_COLUMN, ""))
+        self.mayor: str = _clean(row.get(MAYOR_COLUMN, ""))
+
+    def __repr__(self) -> str:
+        return f"City(id={self.id}, name={self.name!r}, district={self.district!r})"
+
+
+class CityRegistry:
+    """
+    Index over `cities.israeli_cities`, built once at import.
+
+    Records are looked up by name, id or district in O(1). The numeric fields
+    are also kept as flat arrays, aligned with `cities`, for bulk computations.
+    """
+
+    def __init__(self, rows: List[dict]):
+        self.cities: List[City] = [City(row) for row in rows]
+        self.by_name: Dict[str, City] = {city.name: city for city in self.cities}
+        # Also accept the raw source names (with footnote markers)
+        for row, city in zip(rows, self.cities):
+            self.by_name.setdefault(row[NAME_COLUMN], city)
+        self.names: Tuple[str, ...] = tuple(city.name for city in self.cities)
+        self.by_id: Dict[int, City] = {city.id: city for city in self.cities}
+        self.by_district: Dict[str, List[City]] = {}
+        for city in self.cities:
+            self.by_district.setdefault(city.district, []).append(city)
+
+        self.populations = array("q", (city.population or 0 for city in self.cities))
+        self.areas = array("q", (city.area_dunams or 0 for city in self.cities))
+        self.densities = array("q", (city.density or 0 for city in self.cities))
+        self.socioeconomic_ranks = array("b", (city.socioeconomic_rank or 0 for city in self.cities))
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def __iter__(self):
+        return iter(self.cities)
+
+    @property
+    def districts(self) -> List[str]:
+        return list(self.by_district)
+
+    def get(self, name: str) -> Optional[City]:
+        return self.by_name.get(name)
+
+    def get_by_id(self, city_id: int) -> Optional[City]:
+        return self.by_id.get(city_id)
+
+    def in_district(self, district: str) -> List[City]:
+        return self.by_district.get(district, [])
+
+
+city_registry = CityRegistry(israeli_cities)
@@ -0,0 +1,233 @@
+import codecs
+import csv
+import logging
+import os
+import uuid
+from io import StringIO
+from collections import OrderedDict
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, List, Optional
+
+from fastapi import UploadFile
+from prisma import Prisma
+
+from services.city_names import city_names
+from services.professions import ProfessionRegistry
+
+logger = logging.getLogger(__name__)
+
+# Number of CSV rows resolved and inserted per batch
+IMPORT_CHUNK_SIZE = int(os.getenv("CSV_IMPORT_CHUNK_SIZE", "5000"))
+# Bytes read from the upload at a time
+READ_CHUNK_SIZE = 64 * 1024
+# Number of finished jobs kept for polling
+MAX_STORED_JOBS = 100
+
+
+def _complete_records_end(text: str) -> int:
+    """Returns the offset just past the last newline that ends a complete CSV record."""
+    end = 0
+    quotes = 0
+    pos = 0
+    while True:
+        newline = text.find("\n", pos)
+        if newline == -1:
+            return end
+        quotes += text.count('"', pos, newline)
+        # A newline inside a quoted field leaves an odd number of quotes behind it
+        if quotes % 2 == 0:
+            end = newline + 1
+        pos = newline + 1
+
+
+async def iter_csv_rows(
+    file: UploadFile,
+    encoding: str = 'utf-8',
+    skip_header: bool = False,
+    on_read: Optional[Callable[[int], None]] = None,
+) -> AsyncIterator[List[str]]:
+    """
+    Parses an uploaded CSV file incrementally.
+
+    The upload is read in fixed-size chunks and decoded incrementally, so
+    memory use does not depend on the file size. Text is only handed to the
+    CSV parser up to the end of the last complete record, which keeps quoted
+    multi-line fields intact across chunk boundaries.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        encoding (str): Text encoding of the file.
+        skip_header (bool): Whether to drop the first row.
+        on_read (Callable[[int], None]): Called with the size of every chunk read.
+
+    Yields:
+        List[str]: The parsed rows.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ""
+    skip = skip_header
+    while True:
+        chunk = await file.read(READ_CHUNK_SIZE)
+        if on_read:
+            on_read(len(chunk))
+        buffer += decoder.decode(chunk, final=not chunk)
+
+        end = _complete_records_end(buffer) if chunk else len(buffer)
+        if end:
+            for row in csv.reader(StringIO(buffer[:end])):
+                if skip:
+                    skip = False
+                    continue
+                yield row
+            buffer = buffer[end:]
+
+        if not chunk:
+            return
+
+
+class ProfessionalImporter:
+    """
+    Bulk importer for professionals read from CSV rows.
+
+    Rows are handled in chunks: professions are resolved once per distinct
+    name, existing phones are fetched with one query per chunk, and new
+    professionals are inserted with a single `create_many`. The importer
+    doubles as the import job resource, exposing its progress counters.
+    """
+
+    def __init__(
+        self,
+        prisma: Prisma,
+        professions: ProfessionRegistry,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        job_id: Optional[str] = None,
+    ):
+        self.id = job_id or uuid.uuid4().hex
+        self.prisma = prisma
+        self.professions = professions
+        self.chunk_size = chunk_size
+        self.status = "PENDING"
+        self.error: Optional[str] = None
+        self.bytes_total: Optional[int] = None
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    def add_bytes_read(self, size: int) -> None:
+        self.bytes_read += size
+
+    async def _resolve_professions(self, names: Iterable[str]) -> None:
+        missing = sorted({name for name in names if self.professions.id_for(name) is None})
+        if not missing:
+            return
+        await self.prisma.profession.create_many(
+            data=[{"name": name} for name in missing],
+            skip_duplicates=True
+        )
+        professions = await self.prisma.profession.find_many(
+            where={"name": {"in": missing}}
+        )
+        for profession in professions:
+            self.professions.add(profession)
+
+    async def import_chunk(self, rows: List[List[str]]) -> None:
+        """Imports one chunk of CSV rows."""
+        self.rows_read += len(rows)
+        valid = [row[:6] for row in rows if len(row) >= 6]  # Ensure row has all required fields
+        self.skipped += len(rows) - len(valid)
+        if not valid:
+            return
+
+        await self._resolve_professions(row[2] for row in valid)
+
+        # Check which professionals already exist
+        phones = list({row[1] for row in valid})
+        existing = await self.prisma.professional.find_many(
+            where={"phone": {"in": phones}}
+        )
+        seen = {p.phone for p in existing}
+
+        data = []
+        for name, phone, profession_name, available, location, area in valid:
+            if phone in seen:
+                self.skipped += 1
+                continue
+            seen.add(phone)
+            data.append({
+                "name": name,
+                "phone": phone,
+                "professionId": self.professions.id_for(profession_name),
+                "available": available.lower() == 'true',
+                "location": city_names.canonicalize(location),
+            })
+
+        if data:
+            self.inserted += await self.prisma.professional.create_many(data=data)
+
+    async def run(self, rows: AsyncIterable[List[str]]) -> dict:
+        """
+        Imports all rows (without the header).
+
+        Args:
+            rows (AsyncIterable[List[str]]): Parsed CSV rows.
+
+        Returns:
+            dict: Import summary.
+        """
+        self.status = "RUNNING"
+        try:
+            chunk = []
+            async for row in rows:
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    await self.import_chunk(chunk)
+                    chunk = []
+            if chunk:
+                await self.import_chunk(chunk)
+            self.status = "COMPLETED"
+        except Exception as e:
+            self.status = "FAILED"
+            self.error = str(e)
+            raise
+        finally:
+            self.finished_at = datetime.now()
+
+        logger.info(f"CSV import finished: {self.inserted} inserted, {self.skipped} skipped.")
+        return self.to_dict()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "bytes_total": self.bytes_total,
+            "bytes_read": self.bytes_read,
+            "rows_read": self.rows_read,
+            "professionals_added": self.inserted,
+            "skipped": self.skipped,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+import_jobs: "OrderedDict[str, ProfessionalImporter]" = OrderedDict()
+
+
+def create_import_job(
+    prisma: Prisma,
+    professions: ProfessionRegistry,
+    job_id: Optional[str] = None,
+) -> ProfessionalImporter:
+    """Creates an importer and registers it so its progress can be polled."""
+    job = ProfessionalImporter(prisma, professions, job_id=job_id)
+    import_jobs[job.id] = job
+    while len(import_jobs) > MAX_STORED_JOBS:
+        import_jobs.popitem(last=False)
+    return job
+
+
+def get_import_job(job_id: str) -> Optional[ProfessionalImporter]:
+    return import_jobs.get(job_id)
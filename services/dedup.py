@@ -0,0 +1,49 @@
+import os
+from typing import Hashable
+
+from cachetools import TTLCache
+
+# Seconds a provider message id is remembered (webhook retries come well within)
+MESSAGE_DEDUP_TTL = int(os.getenv("MESSAGE_DEDUP_TTL", str(24 * 3600)))
+# Maximum number of remembered ids (least recently used are evicted first)
+MESSAGE_DEDUP_SIZE = int(os.getenv("MESSAGE_DEDUP_SIZE", "100000"))
+
+
+class MessageIdDeduplicator:
+    """
+    In-memory set of recently received provider message ids.
+
+    Catches webhook retries without a database round-trip. It is only a
+    front: ids evicted, or received by another process, are caught by the
+    unique Message.providerMessageId constraint instead.
+    """
+
+    def __init__(self, maxsize: int = MESSAGE_DEDUP_SIZE, ttl: int = MESSAGE_DEDUP_TTL):
+        self._ids = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.accepted = 0
+        self.duplicates = 0
+
+    def claim(self, message_id: Hashable) -> bool:
+        """Records `message_id`; returns False if it was already recorded."""
+        if message_id in self._ids:
+            self.duplicates += 1
+            return False
+        self._ids[message_id] = True
+        self.accepted += 1
+        return True
+
+    def release(self, message_id: Hashable) -> None:
+        """Forgets a claimed id whose message was not stored, so a retry is processed."""
+        self._ids.pop(message_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._ids),
+            "maxsize": self._ids.maxsize,
+            "ttl_seconds": self._ids.ttl,
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+        }
+
+
+message_ids = MessageIdDeduplicator()
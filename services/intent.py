@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from services.intent_cache import IntentCache, intent_cache
+from services.intent_rules import IntentClassifier, intent_classifier
+from services.intent_schema import IntentResult
+from services.llm_client import LLMClient, LLMUnavailable
+from services.tokens import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of completions in flight at once (per process)
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("INTENT_MAX_CONCURRENCY", "8"))
+# Messages waiting for analysis are sent together once this many are queued...
+INTENT_BATCH_SIZE = int(os.getenv("INTENT_BATCH_SIZE", "16"))
+# ...or once the oldest of them has waited this long
+INTENT_BATCH_WINDOW_MS = float(os.getenv("INTENT_BATCH_WINDOW_MS", "10"))
+
+# Cheaper models classify short replies as well as gpt-4 does
+INTENT_MODEL = os.getenv("OPENAI_INTENT_MODEL", "gpt-4o-mini")
+# Longer messages are truncated to this many tokens before analysis
+INTENT_MAX_MESSAGE_TOKENS = int(os.getenv("INTENT_MAX_MESSAGE_TOKENS", "200"))
+# Completion tokens allowed per analyzed message
+INTENT_OUTPUT_TOKENS = int(os.getenv("INTENT_OUTPUT_TOKENS", "80"))
+# Ask for a JSON object response (unsupported by the original gpt-4 models)
+INTENT_JSON_MODE = os.getenv("INTENT_JSON_MODE", "true").lower() in ("1", "true", "yes")
+
+INTENT_SYSTEM_PROMPT = """
+אתה מסווג הודעות וואטסאפ של בעלי מקצוע שמקבלים קריאות שירות.
+לכל הודעה החזר:
+- intent: accept (מקבל את העבודה), complete (סיים את העבודה), decline (מסרב או לא זמין), question (שואל שאלה), other (כל השאר)
+- summary: הכוונה המרכזית של ההודעה, בשורה אחת קצרה
+- when, location: רק אם מוזכרים בהודעה, כפי שנכתבו, אחרת null
+- price: המחיר בשקלים כמספר בלבד (למשל 300), רק אם מוזכר בהודעה, אחרת null
+החזר JSON בלבד: {"results": [{"intent": "...", "summary": "...", "when": null, "location": null, "price": null}]}
+עם תוצאה אחת לכל הודעה ברשימה, באותו הסדר.
+""".strip()
+
+
+class IntentAnalyzer:
+    """
+    Analyzes the intent of incoming messages into an IntentResult.
+
+    Short replies the keyword classifier recognizes are labelled locally;
+    everything else is looked up in the intent cache and, on a miss, sent to
+    the LLM, through a client with deadlines, retries and a circuit breaker.
+    When the LLM is unavailable the classifier's best guess is used instead.
+
+    Messages reaching the LLM are micro-batched: those arriving within
+    `batch_window_ms` of each other (up to `batch_size`) share one completion
+    that returns a JSON list of results, so the prompt is paid once per batch.
+    Each message is truncated to `max_message_tokens` and the completion is
+    capped at `output_tokens` per message. Completions run on the event loop
+    without blocking it, and at most `max_concurrency` of them are in flight
+    at the same time.
+    """
+
+    def __init__(
+        self,
+        llm: Optional[LLMClient] = None,
+        model: str = INTENT_MODEL,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        classifier: Optional[IntentClassifier] = intent_classifier,
+        cache: Optional[IntentCache] = intent_cache,
+        batch_size: int = INTENT_BATCH_SIZE,
+        batch_window_ms: float = INTENT_BATCH_WINDOW_MS,
+        max_message_tokens: int = INTENT_MAX_MESSAGE_TOKENS,
+        output_tokens: int = INTENT_OUTPUT_TOKENS,
+        json_mode: bool = INTENT_JSON_MODE,
+    ):
+        self.llm = llm or LLMClient()
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.classifier = classifier
+        self.cache = cache
+        # Cached results are only reused for the same model and result format
+        self.cache_namespace = f"{model}:structured"
+        self.batch_size = batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.tokens = TokenCounter(model)
+        self.max_message_tokens = max_message_tokens
+        self.output_tokens = output_tokens
+        self.json_mode = json_mode
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        # Keep references so in-flight batches are not garbage collected
+        self._batches = set()
+        self.rule_hits = 0
+        self.llm_calls = 0
+        self.llm_batches = 0
+        self.fallbacks = 0
+        self.truncated = 0
+
+    async def analyze(self, text: str) -> Optional[IntentResult]:
+        """
+        Analyzes a single message.
+
+        Args:
+            text (str): The message body.
+
+        Returns:
+            Optional[IntentResult]: The analyzed intent, or None if it could
+            not be determined.
+        """
+        if self.classifier:
+            label = self.classifier.classify(text)
+            if label:
+                self.rule_hits += 1
+                return IntentResult(intent=label)
+
+        if self.cache:
+            cached = self.cache.get(text, self.cache_namespace)
+            if cached is not None:
+                return IntentResult.from_stored(cached)
+
+        self.llm_calls += 1
+        result = await self._submit(text)
+        if result is None:
+            # LLM unavailable: shed to the classifier, without caching its guess
+            self.fallbacks += 1
+            label = self.classifier.classify(text, strict=False) if self.classifier else None
+            return IntentResult(intent=label) if label else None
+        if self.cache:
+            self.cache.set(text, result.to_stored(), self.cache_namespace)
+        return result
+
+    def _submit(self, text: str) -> asyncio.Future:
+        """Queues a message for the next batch and returns its future result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Identical messages in a batch are analyzed once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.llm_batches += 1
+        try:
+            async with self._semaphore:
+                results = await self._complete(texts)
+        except Exception as e:
+            # Never leave the waiting analyze() calls hanging
+            logger.error(f"Error analyzing message intents: {e}")
+            results = [None] * len(texts)
+        by_text = dict(zip(texts, results))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def _prompt_message(self, text: str) -> str:
+        truncated = self.tokens.truncate(text, self.max_message_tokens)
+        if truncated != text:
+            self.truncated += 1
+        return truncated
+
+    async def _complete(self, texts: List[str]) -> List[Optional[IntentResult]]:
+        """Analyzes messages in one completion, one result per message."""
+        options = {"max_tokens": self.output_tokens * len(texts), "temperature": 0}
+        if self.json_mode:
+            options["response_format"] = {"type": "json_object"}
+        messages = [self._prompt_message(text) for text in texts]
+        try:
+            content = await self.llm.complete(
+                self.model,
+                [
+                    {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+                    {"role": "user", "content": json.dumps(messages, ensure_ascii=False)}
+                ],
+                **options
+            )
+        except LLMUnavailable as e:
+            logger.error(f"Error analyzing message intents: {e}")
+            return [None] * len(texts)
+
+        try:
+            # Tolerate prose or code fences around the JSON object
+            items = json.loads(content[content.index("{"):content.rindex("}") + 1])["results"]
+            if len(items) != len(texts):
+                raise ValueError(f"expected {len(texts)} results, got {len(items)}")
+        except Exception as e:
+            if len(texts) == 1:
+                logger.error(f"Unusable intent analysis reply: {e}")
+                return [None]
+            # Unusable reply: fall back to one completion per message
+            logger.warning(f"Batched intent analysis failed, analyzing one by one: {e}")
+            singles = await asyncio.gather(*(self._complete([text]) for text in texts))
+            return [result for (result,) in singles]
+
+        return [self._parse_result(item) for item in items]
+
+    @staticmethod
+    def _parse_result(item) -> Optional[IntentResult]:
+        try:
+            return IntentResult.model_validate(item)
+        except ValidationError as e:
+            logger.warning(f"Invalid intent result {item!r}: {e}")
+            return None
+
+    async def analyze_many(self, texts: List[str]) -> List[Optional[IntentResult]]:
+        """
+        Analyzes a batch of messages concurrently, preserving their order.
+
+        Args:
+            texts (List[str]): The message bodies.
+
+        Returns:
+            List[Optional[IntentResult]]: The analyzed intents, one per message.
+        """
+        return list(await asyncio.gather(*(self.analyze(text) for text in texts)))
+
+    def stats(self) -> dict:
+        total = self.rule_hits + self.llm_calls
+        return {
+            "rule_hits": self.rule_hits,
+            "llm_calls": self.llm_calls,
+            "llm_batches": self.llm_batches,
+            "avg_batch_size": round(self.llm_calls / self.llm_batches, 2) if self.llm_batches else None,
+            "rule_hit_rate": round(self.rule_hits / total, 3) if total else None,
+            "fallbacks": self.fallbacks,
+            "truncated": self.truncated,
+            "model": self.model,
+            "llm": self.llm.stats(),
+        }
+
+
+intent_analyzer = IntentAnalyzer()
+
+
+async def analyze_message_with_chatgpt(prompt: str) -> Optional[IntentResult]:
+    """Analyzes a single message with the shared analyzer."""
+    return await intent_analyzer.analyze(prompt)
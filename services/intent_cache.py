@@ -0,0 +1,130 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from typing import Optional
+
+from cachetools import TTLCache
+
+from services.intent_rules import normalize_message
+
+# Seconds an analyzed intent stays valid (both tiers)
+INTENT_CACHE_TTL = int(os.getenv("INTENT_CACHE_TTL", str(7 * 24 * 3600)))
+# Maximum number of intents kept in memory (least recently used are evicted first)
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "10000"))
+# SQLite file of the on-disk tier; empty to keep the cache in memory only
+INTENT_CACHE_PATH = os.getenv("INTENT_CACHE_PATH", "intent_cache.sqlite3")
+
+# Bumped when the key normalization changes, so stale keys are never matched
+KEY_VERSION = 2
+# A run of the same punctuation mark or symbol ("!!!", "??")
+_REPEATED = re.compile(r"([^\w\s])\1+", re.UNICODE)
+
+
+def message_key(text: str, namespace: str = "") -> str:
+    """
+    Hash of a message's normalized text.
+
+    Messages differing only in case, whitespace, direction marks or repeated
+    punctuation ("מקבל!!!" and "מקבל!") share a key. Question marks and emoji
+    are kept, as they change the intent. Different namespaces (e.g. models
+    or result formats) never do.
+    """
+    normalized = _REPEATED.sub(r"\1", normalize_message(text))
+    return hashlib.sha256(f"{KEY_VERSION}\0{namespace}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class IntentCache:
+    """
+    Two-tier cache of message text -> analyzed intent.
+
+    The memory tier is a TTL/LRU cache; the disk tier is a SQLite table that
+    survives restarts and is shared by workers on the same host. Disk hits are
+    promoted to memory.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = INTENT_CACHE_PATH,
+        maxsize: int = INTENT_CACHE_SIZE,
+        ttl: int = INTENT_CACHE_TTL,
+    ):
+        self.ttl = ttl
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS intent_cache ("
+                "key TEXT PRIMARY KEY, intent TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.purge()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, text: str, namespace: str = "") -> Optional[str]:
+        """Returns the cached intent of `text`, or None if not cached."""
+        key = message_key(text, namespace)
+        intent = self._memory.get(key)
+        if intent is not None:
+            self.memory_hits += 1
+            return intent
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT intent FROM intent_cache WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+            if row:
+                self.disk_hits += 1
+                self._memory[key] = row[0]
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    def set(self, text: str, intent: str, namespace: str = "") -> None:
+        key = message_key(text, namespace)
+        self._memory[key] = intent
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO intent_cache (key, intent, created_at) VALUES (?, ?, ?)",
+                (key, intent, time.time())
+            )
+
+    def purge(self) -> int:
+        """Deletes expired rows from the disk tier and returns their count."""
+        if self._db is None:
+            return 0
+        cursor = self._db.execute(
+            "DELETE FROM intent_cache WHERE created_at <= ?", (time.time() - self.ttl,)
+        )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM intent_cache")
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        disk_size = None
+        if self._db is not None:
+            disk_size = self._db.execute("SELECT COUNT(*) FROM intent_cache").fetchone()[0]
+        return {
+            "size": len(self._memory),
+            "disk_size": disk_size,
+            "maxsize": self._memory.maxsize,
+            "ttl_seconds": self.ttl,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else None,
+        }
+
+
+intent_cache = IntentCache()
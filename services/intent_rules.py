@@ -0,0 +1,130 @@
+import os
+import re
+import unicodedata
+from typing import Optional
+
+from services.intent_schema import Intent
+
+# Longer messages usually carry more than a one-word reply; leave them to the LLM
+MAX_RULE_WORDS = int(os.getenv("INTENT_RULE_MAX_WORDS", "8"))
+
+# Keyword alternatives per intent. Negated accepts ("לא מקבל") are declines,
+# so DECLINE is listed first and its matches are removed before the others run.
+_DECLINE = r"""
+    decline | reject | not\ available
+    | לא\ (?:יכול|יכולה|מקבל|מקבלת|מסכים|מסכימה|זמין|זמינה|פנוי|פנויה|מתאים|רלוונטי|אוכל|מעוניין|מעוניינת)
+    | אין\ לי\ זמן | עסוק | עסוקה | תפוס | תפוסה | מוותר | מוותרת
+"""
+_ACCEPT = r"""
+    accept | accepted | i'?m\ in
+    | מקבל | מקבלת | מסכים | מסכימה
+    | אני\ לוקח | אני\ לוקחת | לוקח\ את\ זה | לוקחת\ את\ זה | אני\ בפנים | אני\ על\ זה
+"""
+_COMPLETE = r"""
+    complete | completed | finished
+    | סיימתי | סיימנו | הסתיים | הסתיימה | גמרתי | גמרנו | בוצע | בוצעה | הושלם | הושלמה
+"""
+# Words that are a workflow reply only when they are the whole message
+# ("זמין" accepts, "אתה זמין מחר" does not)
+_STANDALONE = (
+    (Intent.ACCEPT, r"(?:אני\ )?(?:זמין|זמינה|פנוי|פנויה)"),
+    (Intent.COMPLETE, r"(?:all\ )?done"),
+)
+# Hedged replies ("אני לא בטוח שאני מקבל") need the LLM
+_HEDGE = r"""
+    maybe | not\ sure | probably | אולי | לא\ בטוח | לא\ בטוחה | נראה\ לי | כנראה | אם
+"""
+# Messages made only of thanks, greetings and emoji need no analysis
+_PHATIC = r"""
+    תודה | רבה | תודה\ רבה | אחי | איש\ יקר | יקר | שבת\ שלום | שבוע\ טוב | בוקר\ טוב | ערב\ טוב
+    | לילה\ טוב | באהבה | ok | okay | אוקי | אוקיי | בסדר | מצוין | מצויין | אחלה | thanks | thank\ you
+"""
+
+
+def _alternation(pattern: str) -> "re.Pattern":
+    # Hebrew letters are word characters, so \b works for both scripts
+    return re.compile(rf"(?<!\w)(?:{pattern})(?!\w)", re.VERBOSE | re.IGNORECASE)
+
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_message(text: str) -> str:
+    """Strips direction marks and niqqud, lowercases and collapses whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c) and unicodedata.category(c) != "Cf")
+    return " ".join(text.lower().split())
+
+
+def _is_symbol(c: str) -> bool:
+    # Emoji, punctuation, spaces and combining marks such as variation selectors
+    return c.isspace() or unicodedata.category(c)[0] in "SPZM"
+
+
+class IntentClassifier:
+    """
+    Keyword classifier for short workflow replies.
+
+    Resolves the common one-line replies ("מקבל", "סיימתי", "לא יכול",
+    "תודה 🙏") without calling the LLM. A message is only classified when
+    exactly one intent matches; questions, hedged replies and anything
+    ambiguous, long or unmatched return None so the caller can escalate it.
+    """
+
+    def __init__(self, max_words: int = MAX_RULE_WORDS):
+        self.max_words = max_words
+        self.decline = _alternation(_DECLINE)
+        self.patterns = ((Intent.ACCEPT, _alternation(_ACCEPT)), (Intent.COMPLETE, _alternation(_COMPLETE)))
+        self.standalone = tuple(
+            (intent, re.compile(pattern, re.VERBOSE | re.IGNORECASE)) for intent, pattern in _STANDALONE
+        )
+        self.hedge = _alternation(_HEDGE)
+        self.phatic = _alternation(_PHATIC)
+
+    def classify(self, text: str, strict: bool = True) -> Optional[Intent]:
+        """
+        Classifies a message by its keywords.
+
+        Args:
+            text (str): The message body.
+            strict (bool): Leave long messages unclassified. Callers without
+                an LLM to escalate to pass False.
+
+        Returns:
+            Optional[Intent]: ACCEPT, COMPLETE, DECLINE or OTHER, or None if
+            the message needs the LLM.
+        """
+        text = normalize_message(text)
+        if not text:
+            return Intent.OTHER
+        if strict and len(_WORD.findall(text)) > self.max_words:
+            return None
+        # Questions and hedged replies are never workflow answers by themselves
+        if "?" in text or self.hedge.search(text):
+            return None
+
+        core = "".join(c for c in text if not _is_symbol(c) or c == " ").strip()
+        for intent, pattern in self.standalone:
+            if pattern.fullmatch(core):
+                return intent
+
+        matched = set()
+        rest = text
+        if self.decline.search(rest):
+            matched.add(Intent.DECLINE)
+            rest = self.decline.sub(" ", rest)
+        for intent, pattern in self.patterns:
+            if pattern.search(rest):
+                matched.add(intent)
+        if len(matched) == 1:
+            return matched.pop()
+        if matched:
+            return None
+
+        # Thanks, greetings and emoji only
+        if all(_is_symbol(c) for c in self.phatic.sub(" ", text)):
+            return Intent.OTHER
+        return None
+
+
+intent_classifier = IntentClassifier()
@@ -0,0 +1,65 @@
+import json
+import re
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+class Intent(str, Enum):
+    """What a professional's message asks the workflow to do."""
+
+    ACCEPT = "accept"
+    COMPLETE = "complete"
+    DECLINE = "decline"
+    QUESTION = "question"
+    OTHER = "other"
+
+
+class IntentResult(BaseModel):
+    """Analyzed intent of a message, with the details it mentions."""
+
+    intent: Intent
+    summary: Optional[str] = None  # One-line description of the message
+    when: Optional[str] = None  # Date or time mentioned, as written
+    location: Optional[str] = None  # Place mentioned, as written
+    price: Optional[float] = None  # Price quoted, in shekels
+
+    @field_validator("summary", "when", "location", "price", mode="wrap")
+    @classmethod
+    def _drop_invalid(cls, value, handler):
+        # A malformed detail is dropped rather than losing the whole result
+        try:
+            return handler(value)
+        except ValidationError:
+            return None
+
+    @field_validator("price", mode="before")
+    @classmethod
+    def _parse_price(cls, value):
+        # Prices quoted as text: "300 ₪", "1,200 ש\"ח"
+        if isinstance(value, str):
+            match = _NUMBER.search(value)
+            return float(match.group().replace(",", "")) if match else None
+        return value
+
+    def to_stored(self) -> str:
+        """Serializes the result for Message.intent."""
+        return self.model_dump_json(exclude_none=True)
+
+    @classmethod
+    def from_stored(cls, value: Optional[str]) -> Optional["IntentResult"]:
+        """
+        Parses a stored Message.intent.
+
+        Messages analyzed before intents were structured hold free text; it is
+        kept as the summary of an OTHER intent.
+        """
+        if not value:
+            return None
+        try:
+            return cls.model_validate(json.loads(value))
+        except (ValueError, ValidationError):
+            return cls(intent=Intent.OTHER, summary=value)
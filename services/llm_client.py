@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional
+
+import openai
+from openai import AsyncOpenAI
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+logger = logging.getLogger(__name__)
+
+# Seconds a single completion attempt may take
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "10"))
+# Seconds a completion may take including all retries
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE_SECONDS", "20"))
+# Attempts per completion (1 disables retries)
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+# Consecutive failed completions that open the circuit
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+# Seconds the circuit stays open before a trial call is let through
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Errors worth retrying: timeouts, connection problems, rate limits and 5xx
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMUnavailable(Exception):
+    """Raised when a completion fails or the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are rejected without being attempted. After `reset_timeout` seconds one
+    trial call is let through: success closes the circuit, failure keeps it
+    open for another `reset_timeout`.
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Returns whether a call may be attempted now."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"LLM circuit opened after {self.failures} consecutive failures.")
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+class LLMClient:
+    """
+    Chat completions with deadlines, jittered retries and a circuit breaker.
+
+    Each attempt is bounded by `timeout` and the whole call, retries
+    included, by `deadline`. Only transient errors are retried. A call that
+    still fails counts against the circuit breaker; while it is open, calls
+    fail immediately with LLMUnavailable so callers can fall back at once.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        timeout: float = LLM_TIMEOUT,
+        deadline: float = LLM_DEADLINE,
+        max_attempts: int = LLM_MAX_ATTEMPTS,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        # Retries are handled here, not by the OpenAI client
+        self.client = client or AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"), max_retries=0)
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    async def _attempt(self, model: str, messages: List[dict], options: dict) -> str:
+        response = await asyncio.wait_for(
+            self.client.chat.completions.create(model=model, messages=messages, **options),
+            timeout=self.timeout
+        )
+        return response.choices[0].message.content or ""
+
+    async def _attempts(self, model: str, messages: List[dict], options: dict) -> str:
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type(RETRYABLE_ERRORS),
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_random_exponential(multiplier=0.2, max=2),
+            reraise=True,
+        ):
+            with attempt:
+                if attempt.retry_state.attempt_number > 1:
+                    self.retries += 1
+                return await self._attempt(model, messages, options)
+
+    async def complete(self, model: str, messages: List[dict], **options) -> str:
+        """
+        Runs one chat completion.
+
+        Args:
+            model (str): Model name.
+            messages (List[dict]): Chat messages.
+            **options: Extra completion parameters (max_tokens, response_format...).
+
+        Returns:
+            str: The completion text.
+
+        Raises:
+            LLMUnavailable: If the circuit is open or every attempt failed.
+        """
+        if not self.breaker.allow():
+            raise LLMUnavailable("circuit open")
+
+        self.calls += 1
+        try:
+            content = await asyncio.wait_for(self._attempts(model, messages, options), timeout=self.deadline)
+        except Exception as e:
+            self.failures += 1
+            # Only an unhealthy upstream opens the circuit, not a bad request
+            if isinstance(e, RETRYABLE_ERRORS):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise LLMUnavailable(f"{type(e).__name__}: {e}") from e
+
+        self.breaker.record_success()
+        return content
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "breaker": self.breaker.stats(),
+        }
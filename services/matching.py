@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+from prisma import Prisma
+
+from services.proximity import CityProximity, city_proximity
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the candidate snapshot is rebuilt from the database
+SNAPSHOT_TTL = float(os.getenv("MATCHING_SNAPSHOT_TTL", "60"))
+# Default distance from the call's cities within which professionals match
+# (0 keeps to the call's own cities); shared by notifications and previews
+MATCH_RADIUS_KM = float(os.getenv("MATCH_RADIUS_KM", "0"))
+
+# Score weights (the score of a candidate is their weighted sum, 0..1 each)
+DISTANCE_WEIGHT = 0.5
+LOAD_WEIGHT = 0.3
+IDLE_WEIGHT = 0.2
+
+# Distance at which the distance score reaches zero
+MAX_DISTANCE_KM = 100.0
+# Days without a job after which the idle score is maxed out
+MAX_IDLE_DAYS = 30.0
+
+
+class CandidateSnapshot:
+    """
+    Column-oriented, in-memory copy of all professionals and their
+    assignment statistics, aligned by row.
+    """
+
+    def __init__(self, professionals: list, stats: list, proximity: CityProximity):
+        now = datetime.now(timezone.utc)
+        self.size = len(professionals)
+        self.ids = np.array([p.id for p in professionals], dtype=np.int64)
+        self.profession_ids = np.array([p.professionId for p in professionals], dtype=np.int64)
+        self.available = np.array([p.available for p in professionals], dtype=bool)
+        self.locations = np.array([p.location or "" for p in professionals], dtype=object)
+        self.names = [p.name for p in professionals]
+        self.phones = [p.phone for p in professionals]
+        self.city_index = np.array(
+            [proximity.index_of(p.location) if p.location else None for p in professionals],
+            dtype=float
+        )
+
+        row_of = {p.id: i for i, p in enumerate(professionals)}
+        self.open_load = np.zeros(self.size, dtype=np.int32)
+        self.idle_days = np.full(self.size, MAX_IDLE_DAYS, dtype=np.float32)
+
+        # One row per (professionalId, status) from the group_by aggregate
+        for row in stats:
+            i = row_of.get(row["professionalId"])
+            if i is None:
+                continue
+            if row["status"] == "ACCEPTED":
+                self.open_load[i] += row["_count"]["_all"]
+            last_job = row["_max"]["createdAt"]
+            if last_job:
+                if isinstance(last_job, str):
+                    # group_by returns the engine's raw JSON, not parsed datetimes
+                    last_job = datetime.fromisoformat(last_job.replace("Z", "+00:00"))
+                if last_job.tzinfo is None:
+                    last_job = last_job.replace(tzinfo=timezone.utc)
+                idle = (now - last_job).total_seconds() / 86400
+                self.idle_days[i] = min(self.idle_days[i], idle)
+
+        self.built_at = time.monotonic()
+
+
+class MatchingEngine:
+    """
+    Scores and selects professionals for a service call.
+
+    Candidates are filtered by profession, availability and distance, then
+    scored on distance to the call, open assignment load and time since
+    their last job. All scoring is vectorized
+    over a snapshot that is rebuilt at most every `ttl` seconds, or after
+    `invalidate()`.
+    """
+
+    def __init__(self, proximity: CityProximity = city_proximity, ttl: float = SNAPSHOT_TTL):
+        self.proximity = proximity
+        self.ttl = ttl
+        self._snapshot: Optional[CandidateSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    async def snapshot(self, prisma: Prisma) -> CandidateSnapshot:
+        """Returns the current snapshot, rebuilding it if stale."""
+        async with self._lock:
+            if self._snapshot is None or time.monotonic() - self._snapshot.built_at > self.ttl:
+                professionals = await prisma.professional.find_many()
+                stats = await prisma.servicecallassignment.group_by(
+                    by=["professionalId", "status"],
+                    count=True,
+                    max={"createdAt": True}
+                )
+                self._snapshot = CandidateSnapshot(professionals, stats, self.proximity)
+                logger.info(f"Matching snapshot rebuilt with {self._snapshot.size} professionals.")
+            return self._snapshot
+
+    def distances(self, snapshot: CandidateSnapshot, cities: List[str]) -> np.ndarray:
+        """Distance in km from each candidate to the nearest of `cities`."""
+        if not cities:
+            return np.zeros(snapshot.size)
+        result = np.full(snapshot.size, np.inf)
+        known = []
+        for name in cities:
+            i = self.proximity.index_of(name)
+            if i is None:
+                # Unknown place: only an exact location match counts
+                result[snapshot.locations == name.strip()] = 0.0
+            else:
+                known.append(i)
+        has_city = ~np.isnan(snapshot.city_index)
+        if known and has_city.any():
+            rows = self.proximity.distances[known].min(axis=0)
+            result[has_city] = np.minimum(
+                result[has_city], rows[snapshot.city_index[has_city].astype(np.int64)]
+            )
+        return result
+
+    def rank(
+        self,
+        snapshot: CandidateSnapshot,
+        profession_id: int,
+        cities: List[str],
+        top_k: Optional[int] = None,
+        radius_km: float = MATCH_RADIUS_KM,
+    ) -> List[dict]:
+        """
+        Returns the best candidates, highest score first.
+
+        Args:
+            snapshot (CandidateSnapshot): Candidates to choose from.
+            profession_id (int): Required profession.
+            cities (List[str]): Cities of the service call (empty for anywhere).
+            top_k (Optional[int]): Maximum number of candidates (None for all).
+            radius_km (float): Maximum distance from the call's cities.
+
+        Returns:
+            List[dict]: Candidates with their score and its components.
+        """
+        distance = self.distances(snapshot, cities)
+        eligible = np.flatnonzero(
+            (snapshot.profession_ids == profession_id)
+            & snapshot.available
+            & (distance <= radius_km)
+        )
+        if not eligible.size:
+            return []
+
+        d = distance[eligible]
+        load = snapshot.open_load[eligible]
+        idle = snapshot.idle_days[eligible]
+        scores = (
+            DISTANCE_WEIGHT * (1 - np.minimum(d, MAX_DISTANCE_KM) / MAX_DISTANCE_KM)
+            + LOAD_WEIGHT / (1 + load)
+            + IDLE_WEIGHT * np.minimum(idle, MAX_IDLE_DAYS) / MAX_IDLE_DAYS
+        )
+
+        if top_k is not None and top_k < scores.size:
+            best = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            best = np.arange(scores.size)
+        best = best[np.argsort(-scores[best], kind="stable")]
+
+        return [
+            {
+                "id": int(snapshot.ids[eligible[j]]),
+                "name": snapshot.names[eligible[j]],
+                "phone": snapshot.phones[eligible[j]],
+                "location": snapshot.locations[eligible[j]] or None,
+                "score": round(float(scores[j]), 4),
+                "distance_km": round(float(d[j]), 1),
+                "open_assignments": int(load[j]),
+                "idle_days": round(float(idle[j]), 1),
+            }
+            for j in best
+        ]
+
+    async def match(
+        self,
+        prisma: Prisma,
+        profession_id: int,
+        cities: List[str],
+        top_k: Optional[int] = None,
+        radius_km: float = MATCH_RADIUS_KM,
+    ) -> List[dict]:
+        """Ranks candidates from the current snapshot (see `rank`)."""
+        return self.rank(await self.snapshot(prisma), profession_id, cities, top_k, radius_km)
+
+
+matching_engine = MatchingEngine()
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from prisma import Prisma
+
+from services.chat_export import ChatRecord
+from services.intent import IntentAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Messages inserted per create_many
+BACKFILL_CHUNK_SIZE = int(os.getenv("MESSAGE_BACKFILL_CHUNK_SIZE", "5000"))
+# create_many calls in flight at once
+BACKFILL_CONCURRENCY = int(os.getenv("MESSAGE_BACKFILL_CONCURRENCY", "4"))
+
+
+def content_hash(record: ChatRecord, occurrence: int = 0) -> str:
+    """
+    Identity of an exported message, stable across exports of the same chat.
+
+    `occurrence` tells apart identical messages sent by the same sender in
+    the same second.
+    """
+    key = f"{record.timestamp.isoformat()}\0{record.sender}\0{record.body}\0{occurrence}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def hash_records(records: Iterable[ChatRecord]) -> Iterator[Tuple[str, ChatRecord]]:
+    """Pairs records, in export order, with their content hash."""
+    seen = {}
+    current = None
+    for record in records:
+        if record.timestamp != current:
+            # Duplicates can only share a timestamp, so only that second is tracked
+            seen.clear()
+            current = record.timestamp
+        key = (record.sender, record.body)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        yield content_hash(record, occurrence), record
+
+
+class MessageBackfill:
+    """
+    Bulk loader of exported chat history into the Message table.
+
+    Records are inserted with `create_many` in chunks, several chunks at a
+    time. Every row carries its content hash, which is unique in the table,
+    so re-running a backfill over the same exports skips what is already
+    there. Intent analysis is deferred (intent left NULL) unless an analyzer
+    is given.
+    """
+
+    def __init__(
+        self,
+        prisma: Prisma,
+        chunk_size: int = BACKFILL_CHUNK_SIZE,
+        concurrency: int = BACKFILL_CONCURRENCY,
+        analyzer: Optional[IntentAnalyzer] = None,
+    ):
+        self.prisma = prisma
+        self.chunk_size = chunk_size
+        self.analyzer = analyzer
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.read = 0
+        self.inserted = 0
+        self.started_at: Optional[float] = None
+        self.elapsed = 0.0
+
+    async def insert_chunk(self, chunk: List[Tuple[str, ChatRecord]]) -> None:
+        """Inserts one chunk, skipping messages already backfilled."""
+        intents = [None] * len(chunk)
+        if self.analyzer:
+            results = await self.analyzer.analyze_many([record.body for _, record in chunk])
+            intents = [result.to_stored() if result else None for result in results]
+
+        data = [
+            {
+                "fromName": record.sender,
+                "body": record.body,
+                "timestamp": record.timestamp,
+                "intent": intent,
+                "contentHash": digest,
+            }
+            for (digest, record), intent in zip(chunk, intents)
+        ]
+        async with self._semaphore:
+            self.inserted += await self.prisma.message.create_many(data=data, skip_duplicates=True)
+
+    async def run(self, records: Iterable[ChatRecord]) -> dict:
+        """
+        Backfills all records.
+
+        Args:
+            records (Iterable[ChatRecord]): Messages of one or more exports,
+                each export in file order.
+
+        Returns:
+            dict: Backfill summary.
+        """
+        self.started_at = time.perf_counter()
+        pending = set()
+        chunk = []
+        for item in hash_records(records):
+            chunk.append(item)
+            self.read += 1
+            if len(chunk) >= self.chunk_size:
+                pending.add(asyncio.create_task(self.insert_chunk(chunk)))
+                chunk = []
+                # Keep reading while chunks are written, but not too far ahead
+                if len(pending) >= self.concurrency * 2:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+        if chunk:
+            pending.add(asyncio.create_task(self.insert_chunk(chunk)))
+        await asyncio.gather(*pending)
+        self.elapsed = time.perf_counter() - self.started_at
+
+        logger.info(f"Message backfill finished: {self.inserted} inserted, {self.read - self.inserted} skipped.")
+        return self.to_dict()
+
+    def to_dict(self) -> dict:
+        return {
+            "read": self.read,
+            "inserted": self.inserted,
+            "skipped": self.read - self.inserted,
+            "seconds": round(self.elapsed, 2),
+            "rows_per_second": round(self.read / self.elapsed) if self.elapsed else None,
+        }
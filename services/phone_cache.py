@@ -0,0 +1,89 @@
+import os
+import re
+from typing import Any, Iterable, List
+
+from cachetools import TTLCache
+
+# Seconds a phone -> professional entry stays valid
+PHONE_CACHE_TTL = int(os.getenv("PHONE_CACHE_TTL", "300"))
+# Maximum number of cached phones (least recently used are evicted first)
+PHONE_CACHE_SIZE = int(os.getenv("PHONE_CACHE_SIZE", "10000"))
+
+ISRAEL_PREFIX = "972"
+
+# Returned by lookup() when the phone is not cached
+MISSING = object()
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Normalizes a phone number to international digits only.
+
+    "050-123 4567", "+972501234567" and "972501234567" all become "972501234567".
+    """
+    digits = re.sub(r"\D", "", phone or "")
+    if digits.startswith("0"):
+        digits = ISRAEL_PREFIX + digits[1:]
+    return digits
+
+
+def phone_variants(phone: str) -> List[str]:
+    """Returns the formats a phone number may be stored in."""
+    normalized = normalize_phone(phone)
+    variants = {phone, normalized, "+" + normalized}
+    if normalized.startswith(ISRAEL_PREFIX):
+        variants.add("0" + normalized[len(ISRAEL_PREFIX):])
+    return sorted(v for v in variants if v)
+
+
+class PhoneCache:
+    """
+    TTL/LRU cache of phone number -> professional.
+
+    Keys are normalized phone numbers. Unknown senders are cached as None so
+    that repeated messages from them do not hit the database either.
+    """
+
+    def __init__(self, maxsize: int = PHONE_CACHE_SIZE, ttl: int = PHONE_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, phone: str) -> Any:
+        """Returns the cached professional (or None), or MISSING if not cached."""
+        value = self._cache.get(normalize_phone(phone), MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def store(self, phone: str, professional: Any) -> None:
+        self._cache[normalize_phone(phone)] = professional
+
+    def invalidate(self, phones: Iterable[str]) -> None:
+        for phone in phones:
+            self._cache.pop(normalize_phone(phone), None)
+
+    def invalidate_professional(self, professional_id: int) -> None:
+        """Drops every entry pointing at the given professional."""
+        stale = [k for k, v in self._cache.items() if v is not None and v.id == professional_id]
+        for key in stale:
+            self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl_seconds": self._cache.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+phone_cache = PhoneCache()
@@ -0,0 +1,63 @@
+import logging
+from typing import Dict, Optional
+
+from prisma import Prisma
+
+logger = logging.getLogger(__name__)
+
+
+class ProfessionRegistry:
+    """
+    Process-wide map of profession names to ids.
+
+    The Profession table is tiny and rarely changes, so it is loaded once at
+    startup and kept up to date as professions are created. Lookups that miss
+    fall back to the database, which covers rows created by other processes.
+    """
+
+    def __init__(self):
+        self._ids_by_name: Dict[str, int] = {}
+        self._names_by_id: Dict[int, str] = {}
+
+    async def load(self, prisma: Prisma) -> None:
+        """Loads all professions from the database."""
+        professions = await prisma.profession.find_many()
+        self._ids_by_name.clear()
+        self._names_by_id.clear()
+        for profession in professions:
+            self.add(profession)
+        logger.info(f"Loaded {len(professions)} professions.")
+
+    def add(self, profession) -> None:
+        """Registers a profession record (anything with `id` and `name`)."""
+        self._ids_by_name[profession.name] = profession.id
+        self._names_by_id[profession.id] = profession.name
+
+    def id_for(self, name: str) -> Optional[int]:
+        return self._ids_by_name.get(name)
+
+    def name_for(self, profession_id: Optional[int]) -> Optional[str]:
+        return self._names_by_id.get(profession_id)
+
+    async def resolve_id(self, prisma: Prisma, name: str) -> Optional[int]:
+        """Returns the id for a profession name, querying the database on a miss."""
+        profession_id = self.id_for(name)
+        if profession_id is None:
+            profession = await prisma.profession.find_unique(where={"name": name})
+            if profession:
+                self.add(profession)
+                profession_id = profession.id
+        return profession_id
+
+    async def resolve_name(self, prisma: Prisma, profession_id: int) -> Optional[str]:
+        """Returns the name for a profession id, querying the database on a miss."""
+        name = self.name_for(profession_id)
+        if name is None:
+            profession = await prisma.profession.find_unique(where={"id": profession_id})
+            if profession:
+                self.add(profession)
+                name = profession.name
+        return name
+
+
+profession_registry = ProfessionRegistry()
@@ -0,0 +1,125 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from city_coordinates import city_coordinates
+from services.city_names import CityNameIndex, city_names
+from services.city_registry import CityRegistry, city_registry
+
+EARTH_RADIUS_KM = 6371.0
+
+# Search radii tried in order until enough candidates are found
+SEARCH_RINGS_KM = (0.0, 10.0, 25.0, 50.0, 100.0)
+
+# Distance assumed between cities of the same district when one has no coordinates
+SAME_DISTRICT_KM = 50.0
+
+
+class CityProximity:
+    """
+    Precomputed city-to-city distances.
+
+    Distances are great-circle distances between city centres, computed once
+    for every pair. Cities without coordinates fall back to their district:
+    same-district cities are treated as SAME_DISTRICT_KM apart.
+    """
+
+    def __init__(
+        self,
+        registry: CityRegistry,
+        coordinates: Dict[str, Tuple[float, float]],
+        names: CityNameIndex,
+    ):
+        self.names = names
+        self.cities = list(registry)
+        self.index = {city.name: i for i, city in enumerate(self.cities)}
+
+        coords = np.array([coordinates.get(city.name, (np.nan, np.nan)) for city in self.cities])
+        lat = np.radians(coords[:, 0])[:, None]
+        lon = np.radians(coords[:, 1])[:, None]
+        a = (
+            np.sin((lat - lat.T) / 2) ** 2
+            + np.cos(lat) * np.cos(lat.T) * np.sin((lon - lon.T) / 2) ** 2
+        )
+        self.distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+        districts = np.array([city.district for city in self.cities])
+        same_district = districts[:, None] == districts[None, :]
+        missing = np.isnan(self.distances)
+        self.distances[missing & same_district] = SAME_DISTRICT_KM
+        self.distances[missing & ~same_district] = np.inf
+        np.fill_diagonal(self.distances, 0.0)
+
+        # Neighbours of every city, nearest first
+        self.neighbours = np.argsort(self.distances, axis=1, kind="stable")
+
+    def index_of(self, name: str) -> Optional[int]:
+        city = self.names.resolve(name)
+        return self.index.get(city.name) if city else None
+
+    def distance_km(self, a: str, b: str) -> Optional[float]:
+        i, j = self.index_of(a), self.index_of(b)
+        if i is None or j is None:
+            return None
+        return float(self.distances[i, j])
+
+    def nearby(self, name: str, radius_km: float) -> List[Tuple[str, float]]:
+        """Returns the cities within `radius_km` of `name`, nearest first."""
+        i = self.index_of(name)
+        if i is None:
+            return []
+        result = []
+        for j in self.neighbours[i]:
+            distance = self.distances[i, j]
+            if distance > radius_km:
+                break
+            result.append((self.cities[j].name, float(distance)))
+        return result
+
+    def distances_from(self, names: Iterable[str], radius_km: float) -> Dict[str, float]:
+        """
+        Returns every city within `radius_km` of any of `names`, with its
+        distance to the nearest of them. Unknown names are kept at distance 0.
+        """
+        result: Dict[str, float] = {}
+        rows = []
+        for name in names:
+            i = self.index_of(name)
+            if i is None:
+                result[name.strip()] = 0.0
+            else:
+                rows.append(i)
+        if rows:
+            nearest = self.distances[rows].min(axis=0)
+            for j in np.flatnonzero(nearest <= radius_km):
+                result[self.cities[j].name] = float(nearest[j])
+        return result
+
+
+def rank_by_distance(
+    candidates: List[dict],
+    min_results: int,
+    rings: Iterable[float] = SEARCH_RINGS_KM,
+) -> List[dict]:
+    """
+    Picks candidates from the smallest search ring that holds at least
+    `min_results` of them, nearest first.
+
+    Args:
+        candidates (List[dict]): Candidates with a "distance_km" key.
+        min_results (int): Number of candidates wanted.
+        rings (Iterable[float]): Increasing search radii in km.
+
+    Returns:
+        List[dict]: The selected candidates, sorted by distance.
+    """
+    ranked = sorted(candidates, key=lambda c: c["distance_km"])
+    for radius in rings:
+        within = [c for c in ranked if c["distance_km"] <= radius]
+        if len(within) >= min_results:
+            return within
+    return [c for c in ranked if math.isfinite(c["distance_km"])]
+
+
+city_proximity = CityProximity(city_registry, city_coordinates, city_names)
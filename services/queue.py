@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Window used to compute the processing throughput
+THROUGHPUT_WINDOW_SECONDS = 60
+
+
+class MessageQueue:
+    """
+    In-process asyncio job queue drained by a fixed pool of worker tasks.
+
+    Jobs are handed to `handler` in FIFO order. The queue keeps the counters
+    needed for monitoring: depth, wait time (lag) and throughput.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[None]], workers: int = 4, maxsize: int = 0):
+        self.handler = handler
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks: List[asyncio.Task] = []
+        self._completed_at: deque = deque()
+
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dequeued = 0
+        self.last_lag: Optional[float] = None
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+    async def start(self) -> None:
+        """Starts the worker tasks."""
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+        logger.info(f"Message queue started with {self.workers} workers.")
+
+    async def stop(self, timeout: float = 30) -> None:
+        """Waits up to `timeout` seconds for pending jobs, then cancels the workers."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Message queue stopped with {self._queue.qsize()} pending jobs.")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        logger.info("Message queue stopped.")
+
+    async def join(self) -> None:
+        """Waits until every enqueued job has been processed."""
+        await self._queue.join()
+
+    async def enqueue(self, job: Any) -> None:
+        """Adds a job to the queue."""
+        await self._queue.put((time.monotonic(), job))
+        self.enqueued += 1
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            enqueued_at, job = await self._queue.get()
+            lag = time.monotonic() - enqueued_at
+            self.dequeued += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._total_lag += lag
+            try:
+                await self.handler(job)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Queue worker {index} failed to process job: {e}")
+            finally:
+                self._record_completion()
+                self._queue.task_done()
+
+    def _record_completion(self) -> None:
+        now = time.monotonic()
+        self._completed_at.append(now)
+        while self._completed_at and now - self._completed_at[0] > THROUGHPUT_WINDOW_SECONDS:
+            self._completed_at.popleft()
+
+    def stats(self) -> dict:
+        """Returns the queue metrics for monitoring."""
+        now = time.monotonic()
+        recent = sum(1 for t in self._completed_at if now - t <= THROUGHPUT_WINDOW_SECONDS)
+        return {
+            "depth": self._queue.qsize(),
+            "workers": len(self._tasks),
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_lag_seconds": self.last_lag,
+            "avg_lag_seconds": self._total_lag / self.dequeued if self.dequeued else None,
+            "max_lag_seconds": self.max_lag,
+            "throughput_per_second": recent / THROUGHPUT_WINDOW_SECONDS,
+        }
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Used when the model's encoding is unknown to tiktoken
+DEFAULT_ENCODING = "cl100k_base"
+# Conservative characters-per-token estimate when no encoding can be loaded
+# (Hebrew averages fewer characters per token than English)
+FALLBACK_CHARS_PER_TOKEN = 2
+
+# Seconds to wait for the encoding to load (tiktoken may download it)
+TOKENIZER_LOAD_TIMEOUT = float(os.getenv("TOKENIZER_LOAD_TIMEOUT", "10"))
+
+ELLIPSIS = "…"
+
+
+class TokenCounter:
+    """
+    Counts and truncates text in a model's tokens.
+
+    tiktoken downloads encodings the first time they are used, with a
+    blocking request, so the encoding is only loaded by `load()` /
+    `load_async()` (at application startup), never on first use. Until it is
+    loaded, or if loading is impossible (e.g. no network), a character-based
+    estimate is used instead.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding: Optional[tiktoken.Encoding] = None
+        self._unavailable = False
+
+    @property
+    def encoding(self) -> Optional[tiktoken.Encoding]:
+        return self._encoding
+
+    def load(self) -> None:
+        """Loads the model's encoding (blocking; may download it)."""
+        if self._encoding is not None or self._unavailable:
+            return
+        try:
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+        except Exception as e:
+            logger.warning(f"Could not load a tiktoken encoding for {self.model}, estimating tokens: {e}")
+            self._unavailable = True
+
+    async def load_async(self, timeout: float = TOKENIZER_LOAD_TIMEOUT) -> None:
+        """Loads the encoding in a worker thread, waiting at most `timeout` seconds."""
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self.load), timeout)
+        except asyncio.TimeoutError:
+            # The thread may still finish; tokens are estimated until then
+            logger.warning(f"Loading the tiktoken encoding for {self.model} timed out, estimating tokens")
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return -(-len(text) // FALLBACK_CHARS_PER_TOKEN)
+        # Messages are user text: special tokens such as "<|endoftext|>" are
+        # encoded as plain text instead of raising ValueError
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cuts `text` to at most `max_tokens` tokens, marking the cut with an ellipsis."""
+        if self.encoding is None:
+            limit = max_tokens * FALLBACK_CHARS_PER_TOKEN
+            return text if len(text) <= limit else text[:limit - 1] + ELLIPSIS
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens - 1]) + ELLIPSIS
@@ -1,63 +1,169 @@
 import requests
+import httpx
 import os
 import logging
+from typing import Optional
+from requests.adapters import HTTPAdapter
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def send_message(to: str, body: str) -> bool:
+# Size of the keep-alive connection pool to the WhatsApp API
+POOL_SIZE = int(os.getenv("WHATSAPP_POOL_SIZE", "50"))
+# Seconds to wait for the WhatsApp API before giving up on a message
+REQUEST_TIMEOUT = float(os.getenv("WHATSAPP_TIMEOUT", "10"))
+
+
+def _build_headers(token: str) -> dict:
+    return {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "authorization": f"Bearer {token}"
+    }
+
+
+def _build_url(api_url: str) -> str:
+    return api_url.rstrip('/') + '/messages/text'
+
+
+class WhatsAppClient:
     """
-    Sends a message to the specified recipient with the given body.
+    Reusable WhatsApp sender backed by a keep-alive `requests` session.
+
+    The token, URL and headers are resolved once, when the client is created.
+    """
+
+    def __init__(self, token: Optional[str] = None, api_url: Optional[str] = None, pool_size: int = POOL_SIZE):
+        self.token = token or os.getenv('TOKEN')
+        self.url = _build_url(api_url or os.getenv('API_URL', ''))
+        self.session = requests.Session()
+        self.session.headers.update(_build_headers(self.token))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
-    Args:
-        to (str): The recipient's address (e.g., phone number or user ID).
-        body (str): The content of the message to be sent.
+    def send_message(self, to: str, body: str) -> bool:
+        """
+        Sends a message to the specified recipient with the given body.
 
-    Returns:
-        bool: True if the message was sent successfully, False if it failed.
+        Args:
+            to (str): The recipient's address (e.g., phone number or user ID).
+            body (str): The content of the message to be sent.
+
+        Returns:
+            bool: True if the message was sent successfully, False if it failed.
+        """
+        if not self.token:
+            logger.error("Authorization token is missing. Please check the environment variables.")
+            return False
+
+        try:
+            response = self.session.post(self.url, json={"to": to, "body": body}, timeout=REQUEST_TIMEOUT)
+            return _check_response(to, response.status_code, response.text)
+
+        except requests.exceptions.RequestException as e:
+            # Log any request exceptions
+            logger.error(f"An error occurred while sending the message: {e}")
+            return False
+        except Exception as e:
+            # Log unexpected errors
+            logger.error(f"An unexpected error occurred: {e}")
+            return False
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncWhatsAppClient:
     """
-    # Retrieve token from environment variables (dynamic value)
-    token = os.getenv('TOKEN')
-    if not token:
-        logger.error("Authorization token is missing. Please check the environment variables.")
-        return False
-
-    # API URL (static)
-    url = os.getenv('API_URL').rstrip('/')
-    url_with_type = url + '/messages/text'    
-
-    print(url_with_type )
-    # Prepare payload
-    payload = {
-        "to": to,
-        "body": body
-    }
+    Reusable async WhatsApp sender backed by a pooled `httpx.AsyncClient`.
 
-    # Static headers + dynamic authorization header
-    headers = {
-        "accept": "application/json",         # Static
-        "content-type": "application/json",   # Static
-        "authorization": f"Bearer {token}"    # Dynamic (loaded from environment)
-    }
+    The token, URL and headers are resolved once, when the client is created.
+    """
+
+    def __init__(self, token: Optional[str] = None, api_url: Optional[str] = None, pool_size: int = POOL_SIZE):
+        self.token = token or os.getenv('TOKEN')
+        self.url = _build_url(api_url or os.getenv('API_URL', ''))
+        self.client = httpx.AsyncClient(
+            headers=_build_headers(self.token),
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def send_message(self, to: str, body: str) -> bool:
+        """
+        Sends a message to the specified recipient with the given body.
+
+        Args:
+            to (str): The recipient's address (e.g., phone number or user ID).
+            body (str): The content of the message to be sent.
+
+        Returns:
+            bool: True if the message was sent successfully, False if it failed.
+        """
+        if not self.token:
+            logger.error("Authorization token is missing. Please check the environment variables.")
+            return False
 
-    try:
-        # Send POST request
-        response = requests.post(url_with_type , json=payload, headers=headers)
+        try:
+            response = await self.client.post(self.url, json={"to": to, "body": body})
+            return _check_response(to, response.status_code, response.text)
 
-        # Check if the request was successful
-        if response.status_code == 200:
-            logger.info(f"Message successfully sent to {to}.")
-            return True
-        else:
-            logger.error(f"Failed to send message. Status code: {response.status_code}, Response: {response.text}")
+        except httpx.HTTPError as e:
+            # Log any request exceptions
+            logger.error(f"An error occurred while sending the message: {e}")
             return False
+        except Exception as e:
+            # Log unexpected errors
+            logger.error(f"An unexpected error occurred: {e}")
+            return False
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def _check_response(to: str, status_code: int, text: str) -> bool:
+    if status_code == 200:
+        logger.info(f"Message successfully sent to {to}.")
+        return True
+    logger.error(f"Failed to send message. Status code: {status_code}, Response: {text}")
+    return False
+
+
+# Shared clients, created on first use so that environment variables loaded
+# by the application (e.g. via dotenv) are picked up.
+_client: Optional[WhatsAppClient] = None
+_async_client: Optional[AsyncWhatsAppClient] = None
+
+
+def get_client() -> WhatsAppClient:
+    global _client
+    if _client is None:
+        _client = WhatsAppClient()
+    return _client
+
+
+def get_async_client() -> AsyncWhatsAppClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncWhatsAppClient()
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Closes the shared async client, if it was created."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def send_message(to: str, body: str) -> bool:
+    """Sends a message with the shared pooled client (blocking)."""
+    return get_client().send_message(to, body)
+
 
-    except requests.exceptions.RequestException as e:
-        # Log any request exceptions
-        logger.error(f"An error occurred while sending the message: {e}")
-        return False
-    except Exception as e:
-        # Log unexpected errors
-        logger.error(f"An unexpected error occurred: {e}")
-        return False
+async def send_message_async(to: str, body: str) -> bool:
+    """Sends a message with the shared pooled async client."""
+    return await get_async_client().send_message(to, body)